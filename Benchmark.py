@@ -0,0 +1,249 @@
+"""
+Benchmarks for the SATCollision module.
+
+Times the bounding box check, the SAT algorithm, the full test, bounding box generation and
+every broad phase on reproducible random convex polygons, writes the results as JSON and
+compares them against a stored baseline.
+
+    python Benchmark.py --output baseline.json
+    python Benchmark.py --baseline baseline.json --threshold 0.25
+
+Times are for a single pass over all PAIR_COUNT pairs, or over the whole scene for the broad phases.
+Each is the median of several timings that run for at least MIN_TIME seconds each, taken over RUNS
+fresh processes, as single fast timings and single processes vary too much between runs to compare.
+Exits with status 1 when any benchmark got slower than the baseline by more than the threshold.
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import statistics
+import sys
+import timeit
+from math import cos, pi, sin
+
+from SATCollision import BoundingBox, CollisionWorld, ConvexShape, DynamicAABBTree, IntersectTester, \
+    SpatialHashGrid, SweepAndPrune
+
+# The vertex counts of the polygons used by the pair benchmarks.
+VERTEX_COUNTS = (4, 8, 32, 128)
+# The number of shapes in the scenes used by the broad phase benchmarks.
+SCENE_SIZES = (100, 1000)
+# How many pairs every pair benchmark runs through per timing.
+PAIR_COUNT = 200
+# The shortest time in seconds a single timing of a benchmark runs for.
+MIN_TIME = 0.2
+# How many fresh processes run the benchmarks. Times differ by 20% or more between processes on the same tree.
+RUNS = 3
+
+
+def random_convex_polygon(rng, vertex_count, radius, x, y):
+    """
+    :return: A list of (x, y) tuples making a convex polygon with its vertices on a circle,
+    at random angles and in counter-clockwise order.
+    """
+    angles = sorted(rng.uniform(0, 2 * pi) for _ in range(vertex_count))
+    return [(x + radius * cos(angle), y + radius * sin(angle)) for angle in angles]
+
+
+def make_pairs(rng, vertex_count, pair_count):
+    """
+    :return: A list of pairs of ConvexShape's. About half of the pairs intersect, and some of the others
+    only have intersecting bounding boxes.
+    """
+    pairs = []
+    for _ in range(pair_count):
+        first = random_convex_polygon(rng, vertex_count, 10, 0, 0)
+        second = random_convex_polygon(rng, vertex_count, 10, rng.uniform(-25, 25), rng.uniform(-25, 25))
+        pairs.append((ConvexShape(first), ConvexShape(second)))
+    return pairs
+
+
+def make_scene(rng, shape_count):
+    """
+    :return: A list of small polygons spread out so that each one touches a few others.
+    """
+    size = 40 * shape_count ** 0.5
+    return [random_convex_polygon(rng, rng.randint(3, 8), rng.uniform(5, 20), rng.uniform(0, size),
+                                  rng.uniform(0, size)) for _ in range(shape_count)]
+
+
+def time_call(function, repeat, min_time=MIN_TIME):
+    """
+    Times a function that takes no arguments.
+    :param repeat: How many timings to take.
+    :param min_time: The shortest time in seconds a single timing runs for. The function is called
+    as many times as needed to reach it.
+    :return: The median time of a single call in seconds, out of the repeats.
+    """
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = int(number * min_time / max(elapsed, 1e-9)) + 1
+    return statistics.median(timer.repeat(repeat, number)) / number
+
+
+def run_benchmarks(seed=0, repeat=5, quick=False, min_time=MIN_TIME):
+    """
+    Runs every benchmark.
+    :param seed: The seed of the random polygons, so runs are comparable.
+    :param repeat: How many times each benchmark is timed. The median time is kept.
+    :param quick: If true, only the smallest vertex count and scene size are run.
+    :param min_time: The shortest time in seconds a single timing runs for.
+    :return: A dict mapping the name of every benchmark to its time in seconds.
+    """
+    vertex_counts = VERTEX_COUNTS[:1] if quick else VERTEX_COUNTS
+    scene_sizes = SCENE_SIZES[:1] if quick else SCENE_SIZES
+    results = {}
+
+    for vertex_count in vertex_counts:
+        rng = random.Random(seed + vertex_count)
+        pairs = make_pairs(rng, vertex_count, PAIR_COUNT)
+        testers = [IntersectTester(shape1, shape2) for shape1, shape2 in pairs]
+        vertices = [list(shape1) for shape1, _ in pairs]
+
+        def minor():
+            for tester in testers:
+                tester.test_minor()
+
+        def major():
+            for tester in testers:
+                tester.test_major()
+
+        def full():
+            for shape1, shape2 in pairs:
+                IntersectTester(shape1, shape2).test()
+
+        def bounds():
+            for polygon in vertices:
+                BoundingBox.generate_bounds_from(polygon)
+
+        for name, function in (('test_minor', minor), ('test_major', major), ('test', full),
+                               ('generate_bounds_from', bounds)):
+            results[name + '/' + str(vertex_count) + '_vertices'] = time_call(function, repeat, min_time)
+
+    for shape_count in scene_sizes:
+        rng = random.Random(seed + shape_count)
+        scene = [ConvexShape(polygon) for polygon in make_scene(rng, shape_count)]
+        moves = [(rng.uniform(-2, 2), rng.uniform(-2, 2)) for _ in scene]
+
+        for name, make_broad_phase in (('SpatialHashGrid', lambda: SpatialHashGrid(64)),
+                                       ('SweepAndPrune', lambda: SweepAndPrune()),
+                                       ('DynamicAABBTree', lambda: DynamicAABBTree())):
+            broad_phase = make_broad_phase()
+            for key, shape in enumerate(scene):
+                broad_phase.insert(key, shape.get_bounds())
+
+            def pairs_of(broad_phase=broad_phase):
+                for _ in broad_phase.pairs():
+                    pass
+
+            def update(broad_phase=broad_phase):
+                # Moving every shape back and forth, so the scene is the same after every call.
+                for sign in (1, -1):
+                    for key, shape in enumerate(scene):
+                        bounds = shape.get_bounds()
+                        dx, dy = moves[key]
+                        broad_phase.update(key, BoundingBox(bounds.x + dx * sign, bounds.y + dy * sign,
+                                                            bounds.width, bounds.height))
+                for key, shape in enumerate(scene):
+                    broad_phase.update(key, shape.get_bounds())
+
+            suffix = '/' + str(shape_count) + '_shapes'
+            results[name + '.pairs' + suffix] = time_call(pairs_of, repeat, min_time)
+            results[name + '.update' + suffix] = time_call(update, repeat, min_time)
+
+        world = CollisionWorld()
+        for shape in scene:
+            world.add(shape)
+
+        def colliding():
+            for _ in world.colliding_pairs():
+                pass
+
+        results['CollisionWorld.colliding_pairs/' + str(shape_count) + '_shapes'] = time_call(colliding, repeat,
+                                                                                              min_time)
+
+    return results
+
+
+def _run_benchmarks(arguments):
+    return run_benchmarks(*arguments)
+
+
+def run_in_processes(runs=RUNS, seed=0, repeat=5, quick=False, min_time=MIN_TIME):
+    """
+    Runs every benchmark in several fresh processes, one after another so they do not compete for cores.
+    :param runs: How many processes to run the benchmarks in.
+    The other parameters are passed to run_benchmarks.
+    :return: A dict mapping the name of every benchmark to its median time in seconds across the processes.
+    """
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        all_results = pool.map(_run_benchmarks, [(seed, repeat, quick, min_time)] * runs, chunksize=1)
+    return {name: statistics.median(results[name] for results in all_results) for name in all_results[0]}
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares benchmark times against a baseline. Benchmarks missing from either side are ignored.
+    :param results: A dict of benchmark names to times.
+    :param baseline: A dict of benchmark names to times from an earlier run.
+    :param threshold: The allowed slowdown as a fraction. 0.1 allows a benchmark to get 10% slower.
+    :return: A list of (name, baseline time, time, ratio) tuples for every benchmark that got slower
+    than the threshold allows, sorted by name.
+    """
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline or baseline[name] <= 0:
+            continue
+        ratio = results[name] / baseline[name]
+        if ratio > 1 + threshold:
+            regressions.append((name, baseline[name], results[name], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the SATCollision module.")
+    parser.add_argument('--output', help="Writes the results to this JSON file.")
+    parser.add_argument('--baseline', help="Compares the results against this JSON file from an earlier run.")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="The allowed slowdown against the baseline as a fraction. Defaults to 0.25.")
+    parser.add_argument('--repeat', type=int, default=5, help="How many times each benchmark is timed.")
+    parser.add_argument('--min-time', type=float, default=MIN_TIME,
+                        help="The shortest time in seconds a single timing runs for. Defaults to " +
+                        str(MIN_TIME) + ".")
+    parser.add_argument('--runs', type=int, default=RUNS,
+                        help="How many fresh processes run the benchmarks. Defaults to " + str(RUNS) + ".")
+    parser.add_argument('--seed', type=int, default=0, help="The seed of the random polygons.")
+    parser.add_argument('--quick', action='store_true', help="Only runs the smallest cases.")
+    args = parser.parse_args(argv)
+
+    results = run_in_processes(args.runs, args.seed, args.repeat, args.quick, args.min_time)
+    for name in sorted(results):
+        print("{:<55} {:>12.3f} us".format(name, results[name] * 1e6))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'python': platform.python_version(), 'seed': args.seed, 'results': results},
+                      file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print()
+            print("Slower than the baseline by more than " + str(args.threshold * 100) + "%:")
+            for name, before, after, ratio in regressions:
+                print("{:<55} {:>12.3f} us -> {:>12.3f} us ({:.2f}x)".format(name, before * 1e6, after * 1e6, ratio))
+            return 1
+        print()
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,5 @@
 import graphics as g
-from SATCollision import BoundingBox, IntersectTester, Vector2
+from SATCollision import BoundingBox, CompoundShape, IntersectTester, Vector2
 
 # Declaring width and height of window
 WIDTH = 500
@@ -94,11 +94,15 @@ bounds2Points = [g.Point(v.x, v.y) for v in  bounds2.corners()]
 bounds2_drawable = g.Polygon(bounds2Points).draw(window)
 bounds2_drawable.setOutline("red")
 
+# The drawn shapes may be concave, so they are split into convex pieces for the tests below.
+firstCompound = CompoundShape(firstShape)
+secondCompound = CompoundShape(secondShape)
+
 # Setting up a variable to be used as the display message
 displayStringAABB = ""
 
 # Displaying AABB check results.
-if IntersectTester(firstShape, secondShape).test_minor():
+if IntersectTester(firstCompound, secondCompound).test_minor():
     displayStringAABB += "AABB: Shapes are intersecting!"
 else:
     displayStringAABB += "AABB: Shapes are NOT intersecting!"
@@ -107,7 +111,7 @@ aabbtext.setTextColor("green")
 
 # Displaying SAT Algorithm results along with MTV arrow.
 displayStringSAT = ""
-satresult = IntersectTester(firstShape, secondShape).test_major()
+satresult = IntersectTester(firstCompound, secondCompound).test_major()
 if satresult.intersecting:
     displayStringSAT = "SAT: Shapes are intersecting!"
     boundsCenter = bounds2.get_center()
@@ -1,224 +1,3970 @@
 """
 A module for determining whether an
 intersection between two convex shapes are occurring.
+Concave polygons are supported through CompoundShape, which splits them into convex pieces.
 """
 
+import sys
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from math import cos, floor, sin, sqrt
+from multiprocessing import get_context
+from multiprocessing.util import Finalize
+from time import perf_counter_ns
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Axes whose directions differ by less than this (the sine of the angle between them) are treated as parallel.
+PARALLEL_TOLERANCE = 1e-9
+# Shapes with at least this many vertices find their projections by hill climbing instead of scanning every vertex.
+HILL_CLIMB_THRESHOLD = 32
+# The 'auto' engine uses GJK when both shapes have at least this many vertices, and SAT otherwise.
+GJK_VERTEX_THRESHOLD = 8
+# The most projections sat_batch and sat_batch_indexed compute at a time. They split their pairs into chunks
+# that stay within it, so their peak memory does not grow with the number of pairs or of vertices.
+SAT_BATCH_BUDGET = 1 << 21
+
+GJK_MAX_ITERATIONS = 64
+EPA_MAX_ITERATIONS = 64
+# Convergence tolerances of GJK (relative to the squared distance) and EPA (absolute).
+GJK_TOLERANCE = 1e-10
+EPA_TOLERANCE = 1e-9
+
+ENGINES = ('sat', 'gjk', 'auto')
+
+
 class IntersectTester:
     """
-    Used to test for intersections between shapes.
+    Used to test for intersections between shapes.
+    """
+
+    # A CollisionStats that every tester counts into, or None to skip counting. Can also be set on a single tester.
+    stats = None
+
+    def __init__(self, pol1, pol2, axis_cache=None, engine='sat', stats=None, result_cache=None):
+        """
+        Spawns an instance of an InterestTester provided the actual shapes to test for.
+        Ensure that both the inputted polygons are not the same.
+        Polygons given as lists of vertices are converted to a ConvexShape once here, so
+        changes made to those lists afterwards are not seen by this tester. Pass ConvexShape
+        instances directly to reuse their cached normals and bounds across many tests.
+        Args:
+            pol1: 1 of 2 polygons that a collision will be tested for.
+            pol2: 1 of 2 polygons that a collision will be tested for.
+            axis_cache: An optional SeparatingAxisCache kept across calls. Only used when both
+            polygons are ConvexShape's, as shapes converted from lists only live as long as this tester.
+            engine: The narrow phase used by test and test_narrow. 'sat' for the SAT algorithm, 'gjk' for
+            GJK and EPA, or 'auto' to pick GJK when both shapes have at least GJK_VERTEX_THRESHOLD vertices.
+            stats: An optional CollisionStats to count into instead of IntersectTester.stats.
+            result_cache: An optional PairResultCache that test looks its result up in first. Only used when
+            both polygons are shapes already, like axis_cache.
+        """
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine: " + repr(engine) + ". Expected one of: " + ", ".join(ENGINES))
+        self.pol1 = pol1
+        self.pol2 = pol2
+        self.shape1 = to_polygon(pol1)
+        self.shape2 = to_polygon(pol2)
+        if self.shape1 is not pol1 or self.shape2 is not pol2:
+            axis_cache = None
+            result_cache = None
+        self.axis_cache = axis_cache
+        self.result_cache = result_cache
+        self.engine = engine
+        if stats is not None:
+            self.stats = stats
+
+    def test_minor(self) -> bool:
+        """
+        Performs only a check against the polygons bounding boxes. May provide inconsistent
+        information about the intersection as a single axis-aligned bounding box check
+        is not very accurate.
+        """
+
+        return self.shape1.get_bounds().intersects_with(self.shape2.get_bounds())
+
+    def test_major(self, contacts=False):
+        """
+        Performs only the SAT algorithm to determine an intersection result. Can be inefficient when used
+        without the test_minor method as there may not even be an intersection between the two shapes
+        and now you're running through an entire SAT algorithm to check for an intersection. When used with test_minor,
+        it will inform you of the possibility of a current intersection between the two shapes.
+        Pairs that include a Circle or a Capsule are tested with their own routines, see test_round,
+        and pairs that include a CompoundShape are tested piece by piece, see test_compound.
+        :param contacts: If true, the contact points of an intersection are found from the axis of least overlap
+        and stored in the result.
+        :return: An IntersectResult containing information on the intersection.
+        """
+        shape1 = self.shape1
+        shape2 = self.shape2
+        if not isinstance(shape1, ConvexShape) or not isinstance(shape2, ConvexShape):
+            return self._test_other('sat', contacts)
+
+        # Control overlap to be changed. Set to high value to find the lowest one.
+        overlap = 999999
+        # A default axis
+        n = Vector2(0, 0)
+
+        axes = _merge_axes(shape1, shape2)
+        cache = self.axis_cache
+        stats = self.stats
+
+        # Trying the axis that separated the shapes last time first, as it most likely still does.
+        first = -1
+        if cache is not None:
+            first = cache.get(shape1, shape2)
+            if first is None or first >= len(axes):
+                first = -1
+            else:
+                p1 = shape1.project(axes[first])
+                p2 = shape2.project(axes[first])
+                if not p1.overlaps(p2):
+                    if stats is not None:
+                        stats.record_sat(shape1, shape2, 1, True)
+                    return IntersectResult(False, Vector2(0, 0))
+                overlap = IntersectTester._overlap_of(p1, p2)
+                n = axes[first]
+        best = first
+
+        # Looping through axes's...
+        for i in range(len(axes)):
+            if i == first:
+                continue
+            normal = axes[i]
+            p1 = shape1.project(normal)
+            p2 = shape2.project(normal)
+
+            # Checking for axes overlap...
+            if p1.overlaps(p2):
+                o = IntersectTester._overlap_of(p1, p2)
+                if o < overlap:
+                    overlap = o
+                    n = normal
+                    best = i
+
+            else:
+                # No Intersection. Quit algorithm right away.
+                if cache is not None:
+                    cache.store(shape1, shape2, i)
+                if stats is not None:
+                    # A cached axis was tested before the loop, and is skipped in it once the loop reaches it.
+                    stats.record_sat(shape1, shape2, i + 2 if first > i else i + 1, True)
+                return IntersectResult(False, Vector2(0, 0))
+
+        if cache is not None:
+            cache.store(shape1, shape2, best)
+        if stats is not None:
+            stats.record_sat(shape1, shape2, len(axes), False)
+
+        shape1Bounds = shape1.get_bounds()
+        shape2Bounds = shape2.get_bounds()
+
+        dot = Vector2.dot(shape2Bounds.get_center() - shape1Bounds.get_center(), n)
+
+        if dot < 0:
+            n = -n
+
+        # If execution gets to this point, the algorithm did not return and thus there is an intersection
+        # between the two shapes.
+        if contacts:
+            return IntersectResult(True, n * overlap, _clip_contacts(shape1, shape2, n.x, n.y, overlap))
+        return IntersectResult(True, n * overlap)
+
+    def test_gjk(self, contacts=False):
+        """
+        Performs only the GJK algorithm to determine an intersection, followed by EPA to find
+        the MTV when the shapes are intersecting. Only needs the support points of the shapes,
+        so its cost grows slowly with the number of vertices.
+        Pairs that include a Circle or a Capsule are tested with their own routines, see test_round,
+        and pairs that include a CompoundShape are tested piece by piece, see test_compound.
+        :param contacts: If true, the contact points of an intersection are found from the EPA normal
+        and stored in the result.
+        :return: An IntersectResult containing information on the intersection.
+        """
+        shape1 = self.shape1
+        shape2 = self.shape2
+        if not isinstance(shape1, ConvexShape) or not isinstance(shape2, ConvexShape):
+            return self._test_other('gjk', contacts)
+        intersecting, simplex = _gjk(shape1, shape2, True)[:2]
+        if self.stats is not None:
+            self.stats.gjk_tests += 1
+        if not intersecting:
+            return IntersectResult(False, Vector2(0, 0))
+        nx, ny, depth = _epa(shape1, shape2, simplex)
+        if contacts:
+            return IntersectResult(True, Vector2(nx * depth, ny * depth),
+                                   _clip_contacts(shape1, shape2, nx, ny, depth))
+        return IntersectResult(True, Vector2(nx * depth, ny * depth))
+
+    def distance(self, max_distance=None):
+        """
+        Finds the distance between the two shapes and the closest points on each of them using GJK.
+        :param max_distance: Optional. When the shapes are known to be further apart than this,
+        the search stops early and None is returned.
+        :return: A DistanceResult, or None when the shapes are further apart than max_distance.
+        The distance is 0 and the closest points are None when the shapes intersect.
+        """
+        if isinstance(self.shape1, CompoundShape) or isinstance(self.shape2, CompoundShape):
+            closest = None
+            for piece1, piece2 in _piece_pairs(self.shape1, self.shape2, False):
+                result = IntersectTester(piece1, piece2).distance(max_distance)
+                if result is not None and (closest is None or result.distance < closest.distance):
+                    closest = result
+                    if closest.distance == 0:
+                        break
+                    max_distance = closest.distance
+            return closest
+
+        # Round shapes are measured through their core point or segment, then shrunk by their radius.
+        core1, radius1 = _core_of(self.shape1)
+        core2, radius2 = _core_of(self.shape2)
+        radius = radius1 + radius2
+        result = _gjk(core1, core2, max_distance=None if max_distance is None else max_distance + radius)
+        if result is None:
+            return None
+        intersecting, simplex, px, py, weights = result
+        if intersecting:
+            return DistanceResult(0.0, None, None)
+
+        x1, y1, x2, y2 = _closest_points(simplex, weights)
+        core_distance = sqrt(px * px + py * py)
+        distance = core_distance - radius
+        if distance <= 0:
+            return DistanceResult(0.0, None, None)
+        if max_distance is not None and distance > max_distance:
+            return None
+        if radius > 0:
+            dx = (x2 - x1) / core_distance
+            dy = (y2 - y1) / core_distance
+            x1 += dx * radius1
+            y1 += dy * radius1
+            x2 -= dx * radius2
+            y2 -= dy * radius2
+        return DistanceResult(distance, Vector2(x1, y1), Vector2(x2, y2))
+
+    def sweep(self, velocity1, velocity2=(0, 0)):
+        """
+        Performs a swept SAT test to find the first time of impact of two moving polygons, so fast shapes
+        can not tunnel through thin ones between two steps. The shapes move in a straight line by their
+        velocity over one step, and the entry and exit times are found on every axis in a single pass.
+        Only supports polygons.
+        :param velocity1: The displacement of the first shape over the step.
+        :param velocity2: The displacement of the second shape over the step. Defaults to no movement.
+        :return: A SweepResult. Its time of impact is the fraction of the step, between 0 and 1, at which the
+        shapes first touch. It is 0 when they already intersect at the start of the step.
+        """
+        shape1 = self.shape1
+        shape2 = self.shape2
+        if not isinstance(shape1, ConvexShape) or not isinstance(shape2, ConvexShape):
+            raise TypeError("sweep only supports polygons. Got: " + type(shape1).__name__ + " and " +
+                            type(shape2).__name__)
+        velocity1 = Vector2.from_type(velocity1)
+        velocity2 = Vector2.from_type(velocity2)
+
+        # Moving the second shape relative to the first, which stays still.
+        vx = velocity2.x - velocity1.x
+        vy = velocity2.y - velocity1.y
+        enter = float('-inf')
+        leave = float('inf')
+        enter_axis = None
+        enter_speed = 0.0
+        for axis in _merge_axes(shape1, shape2):
+            p1 = shape1.project(axis)
+            p2 = shape2.project(axis)
+            speed = vx * axis.x + vy * axis.y
+            if speed == 0:
+                if p2.maximum < p1.minimum or p2.minimum > p1.maximum:
+                    return SweepResult(False, None, None, axis)
+                continue
+            t1 = (p1.minimum - p2.maximum) / speed
+            t2 = (p1.maximum - p2.minimum) / speed
+            if t1 > t2:
+                t1, t2 = t2, t1
+            if t1 > enter:
+                enter = t1
+                enter_axis = axis
+                enter_speed = speed
+            if t2 < leave:
+                leave = t2
+            # The shapes are apart on this axis for the whole step, or never overlap on every axis at once.
+            if enter > leave or enter > 1 or leave < 0:
+                return SweepResult(False, None, None, axis)
+
+        if enter <= 0:
+            result = self.test_major()
+            if result.intersecting and not result.mtv.isZero():
+                return SweepResult(True, 0.0, result.mtv.normalized(), enter_axis)
+            if enter_axis is None:
+                return SweepResult(True, 0.0, None, None)
+            enter = 0.0
+
+        # The normal points from the first shape towards the second, like the MTV of IntersectResult.
+        normal = -enter_axis if enter_speed > 0 else enter_axis
+        return SweepResult(True, enter, normal, enter_axis)
+
+    def _test_other(self, engine, contacts=False):
+        if isinstance(self.shape1, CompoundShape) or isinstance(self.shape2, CompoundShape):
+            return self.test_compound(engine, contacts)
+        return self.test_round(contacts)
+
+    def test_compound(self, engine=None, contacts=False):
+        """
+        Tests pairs that include a CompoundShape by testing every pair of convex pieces whose bounding boxes
+        intersect. The pieces and their bounding boxes are cached on the CompoundShape.
+        :param engine: The engine used for each pair of pieces. Defaults to the engine of this tester.
+        :param contacts: If true, the contact points of the pair of pieces with the largest MTV are stored
+        in the result.
+        :return: An IntersectResult that is intersecting when any pair of pieces intersects. Its MTV is the
+        largest MTV of those pairs.
+        """
+        engine = self.engine if engine is None else engine
+        best = IntersectResult(False, Vector2(0, 0))
+        depth = -1
+        for piece1, piece2 in _piece_pairs(self.shape1, self.shape2, True):
+            result = IntersectTester(piece1, piece2, engine=engine).test_narrow(contacts)
+            if result.intersecting:
+                length_squared = result.mtv.length_squared()
+                if length_squared > depth:
+                    depth = length_squared
+                    best = result
+        return best
+
+    def test_round(self, contacts=False):
+        """
+        Tests pairs that include a Circle or a Capsule. Two circles are compared by the distance between
+        their centers. A circle and a polygon use SAT on the polygon's axes plus the axis from the circle's
+        center to the closest vertex. Other pairs use GJK on the core point or segment of the round
+        shapes, with the MTV grown by their radii.
+        :param contacts: If true, the deepest point of a round shape inside of the other shape is stored
+        in the result as its only contact point.
+        :return: An IntersectResult containing information on the intersection.
+        """
+        shape1 = self.shape1
+        shape2 = self.shape2
+        if isinstance(shape1, Circle) and isinstance(shape2, Circle):
+            result = _circle_circle(shape1, shape2)
+        elif isinstance(shape1, Circle) and isinstance(shape2, ConvexShape):
+            result = _polygon_circle(shape2, shape1)
+            result.mtv = -result.mtv
+        elif isinstance(shape2, Circle) and isinstance(shape1, ConvexShape):
+            result = _polygon_circle(shape1, shape2)
+        else:
+            result = _margin_test(shape1, shape2)
+        if contacts and result.intersecting:
+            mtv = result.mtv
+            if isinstance(shape2, ConvexShape):
+                point = shape1.support(mtv)
+            else:
+                point = shape2.support(-mtv)
+            result.contacts = [ContactPoint(point, mtv.magnitude())]
+        return result
+
+    def test_overlap(self):
+        """
+        Performs only the narrow phase chosen by the engine of this tester, without the bounding box check,
+        and only finds out whether the shapes intersect. The SAT algorithm then projects onto axes that are
+        not normalized and skips everything needed for the MTV, and GJK skips EPA.
+        :return: True if the shapes are intersecting.
+        """
+        shape1 = self.shape1
+        shape2 = self.shape2
+        if not isinstance(shape1, ConvexShape) or not isinstance(shape2, ConvexShape):
+            return self._test_other(self.engine).intersecting
+        if self._narrow_engine() == 'gjk':
+            if self.stats is not None:
+                self.stats.gjk_tests += 1
+            return _gjk(shape1, shape2, True)[0]
+
+        axes = _merge_raw_axes(shape1, shape2)
+        cache = self.axis_cache
+        stats = self.stats
+        # The raw axes are in the same order as the unit axes, so the cached index is shared with test_major.
+        first = -1
+        if cache is not None:
+            first = cache.get(shape1, shape2)
+            if first is None or first >= len(axes):
+                first = -1
+            elif not shape1.project(axes[first]).overlaps(shape2.project(axes[first])):
+                if stats is not None:
+                    stats.record_sat(shape1, shape2, 1, True)
+                return False
+
+        for i in range(len(axes)):
+            if i == first:
+                continue
+            if not shape1.project(axes[i]).overlaps(shape2.project(axes[i])):
+                if cache is not None:
+                    cache.store(shape1, shape2, i)
+                if stats is not None:
+                    stats.record_sat(shape1, shape2, i + 2 if first > i else i + 1, True)
+                return False
+        if stats is not None:
+            stats.record_sat(shape1, shape2, len(axes), False)
+        return True
+
+    def _narrow_engine(self):
+        """
+        :return: 'sat' or 'gjk', picking between them for the 'auto' engine by the vertex counts of the shapes.
+        """
+        engine = self.engine
+        if engine == 'auto':
+            if len(self.shape1) >= GJK_VERTEX_THRESHOLD and len(self.shape2) >= GJK_VERTEX_THRESHOLD:
+                return 'gjk'
+            return 'sat'
+        return engine
+
+    def test_narrow(self, contacts=False, want_mtv=True):
+        """
+        Performs only the narrow phase chosen by the engine of this tester, without the bounding box check.
+        :param contacts: If true, the contact points of an intersection are stored in the result.
+        :param want_mtv: If false, only finds out whether the shapes intersect through test_overlap,
+        and the MTV of the result is None.
+        :return: An IntersectResult containing information on the intersection.
+        """
+        if not want_mtv:
+            return IntersectResult(self.test_overlap(), None)
+        if not isinstance(self.shape1, ConvexShape) or not isinstance(self.shape2, ConvexShape):
+            return self._test_other(self.engine, contacts)
+        if self._narrow_engine() == 'gjk':
+            return self.test_gjk(contacts)
+        return self.test_major(contacts)
+
+    def test(self, contacts=False, want_mtv=True):
+        """
+        Performs a full test - that is the preliminary bounding box check for performance and the narrow phase
+        chosen by the engine, which is the SAT algorithm by default.
+        :param contacts: If true, the contact points of an intersection are stored in the result.
+        See IntersectResult.contacts.
+        :param want_mtv: If false, the MTV is not worked out and is None in the result, which is cheaper
+        when only whether the shapes intersect is needed. No contacts are found then either.
+        :return: IntersectResult containing information representing whether there is an intersection
+        between the two polygons. A result from the result cache is shared and should not be modified.
+        """
+        cache = self.result_cache
+        if cache is None:
+            return self._test_uncached(contacts, want_mtv)
+        options = (self.engine, contacts, want_mtv)
+        result = cache.get(self.shape1, self.shape2, options)
+        if result is None:
+            result = self._test_uncached(contacts, want_mtv)
+            cache.store(self.shape1, self.shape2, options, result)
+        return result
+
+    def _test_uncached(self, contacts, want_mtv):
+        stats = self.stats
+        if stats is not None:
+            return self._test_counted(stats, contacts, want_mtv)
+        bounds_is_intersecting = self.test_minor()
+        if bounds_is_intersecting:
+            return self.test_narrow(contacts, want_mtv)
+        return IntersectResult(False, Vector2(0, 0) if want_mtv else None)
+
+    def _test_counted(self, stats, contacts, want_mtv):
+        """
+        The same as test, while counting every stage into stats and timing it.
+        """
+        stats.tests += 1
+        start = perf_counter_ns()
+        bounds_is_intersecting = self.test_minor()
+        middle = perf_counter_ns()
+        stats.bounds_ns += middle - start
+        if not bounds_is_intersecting:
+            stats.bounds_rejects += 1
+            return IntersectResult(False, Vector2(0, 0) if want_mtv else None)
+        result = self.test_narrow(contacts, want_mtv)
+        stats.narrow_ns += perf_counter_ns() - middle
+        stats.narrow_tests += 1
+        if result.intersecting:
+            stats.intersections += 1
+        return result
+
+    @staticmethod
+    def _overlap_of(p1, p2):
+        """
+        :return: The overlap of two overlapping ShapeProjection's, including the extra distance
+        needed to push one projection out of the other when it is contained inside of it.
+        """
+        o = p1.get_overlap(p2)
+
+        # Checking for containment...
+        if p1.contains(p2) or p2.contains(p1):
+            possibleMin = abs(p1.minimum - p2.minimum)
+            possibleMax = abs(p1.maximum - p2.maximum)
+
+            if possibleMin < possibleMax:
+                o += possibleMin
+            else:
+                o += possibleMax
+        return o
+
+    @staticmethod
+    def test_many(pairs):
+        """
+        Runs the SAT algorithm on many pairs of polygons at once. Requires NumPy.
+        See sat_batch for the details of the returned arrays.
+        :param pairs: A sequence of (pol1, pol2) tuples.
+        :return: A tuple of an array of intersection booleans and an array of MTVs.
+        """
+        polys_a = [pair[0] for pair in pairs]
+        polys_b = [pair[1] for pair in pairs]
+        return sat_batch(polys_a, polys_b)
+
+    @staticmethod
+    def projection_of_onto(pol1, axis):
+        """
+        Makes a Projection of the inputted shape onto the
+        provided axis.
+        :param pol1: The 2D polygon to be projected.
+        :param axis: The Axis to project the polygon onto.
+        :return: A ShapeProjection.
+        """
+        return to_polygon(pol1).project(axis)
+
+
+class PairResultCache:
+    """
+    Remembers the IntersectResult of IntersectTester.test for pairs of shapes, so pairs that are asked
+    about again without changing, such as static shapes, skip the test. An entry is only used while the
+    versions of both shapes are the ones it was made with, so moving or changing either shape invalidates it.
+    Holds at most max_size entries and evicts the least recently used one when full.
+    """
+
+    def __init__(self, max_size=1024):
+        """
+        :param max_size: The most pairs kept at once.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1. Got: " + str(max_size))
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, shape1, shape2, options=None):
+        """
+        :param options: Anything else the result depends on, such as the engine.
+        :return: The cached IntersectResult for the ordered pair of shapes, or None when there is none
+        or when either shape changed since it was stored.
+        """
+        key = (shape1, shape2, options)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != shape1.version or entry[1] != shape2.version:
+            del self._entries[key]
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def store(self, shape1, shape2, options, result):
+        """
+        Caches the result for the ordered pair of shapes at their current versions.
+        """
+        entries = self._entries
+        key = (shape1, shape2, options)
+        entries[key] = (shape1.version, shape2.version, result)
+        entries.move_to_end(key)
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, shape):
+        """
+        Forgets every pair that includes the provided shape, for example when it is removed from a world.
+        """
+        for key in [key for key in self._entries if key[0] is shape or key[1] is shape]:
+            del self._entries[key]
+
+    def clear(self):
+        """
+        Forgets every pair and sets the statistics back to 0.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_stats(self):
+        """
+        :return: A dict of the hits, misses, evictions and invalidations so far, the hit rate and the current size.
+        """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries)}
+
+
+class CollisionStats:
+    """
+    Counters and timings of the tests run by IntersectTester, for finding out where the time goes under load.
+    Counting is opt-in: set IntersectTester.stats to an instance to count every test, or pass one to a single
+    tester. Without one, a tester only pays for a check of its stats attribute. Not thread safe, so give every
+    thread its own instance.
+    """
+
+    # The names of the counters, in the order snapshot lists them.
+    FIELDS = ('tests', 'bounds_rejects', 'narrow_tests', 'intersections', 'sat_tests', 'sat_early_exits',
+              'axes_tested', 'vertices_projected_estimate', 'gjk_tests', 'bounds_ns', 'narrow_ns')
+
+    def __init__(self):
+        self.reset()
+
+    def __repr__(self):
+        return "CollisionStats(" + ", ".join(name + ": " + str(getattr(self, name)) for name in self.FIELDS) + ")"
+
+    def reset(self):
+        """
+        Sets every counter back to 0.
+        """
+        # Calls of test, and how many of them the bounding box check ended.
+        self.tests = 0
+        self.bounds_rejects = 0
+        # Calls of test that ran the narrow phase, and how many of them found an intersection.
+        self.narrow_tests = 0
+        self.intersections = 0
+        # Runs of the SAT algorithm, and how many of them ended on a separating axis.
+        self.sat_tests = 0
+        self.sat_early_exits = 0
+        # The axes the SAT algorithm projected both shapes onto, and the vertices of both shapes times those axes.
+        # The latter is an upper bound rather than a count: shapes that hill climb visit fewer vertices than that.
+        self.axes_tested = 0
+        self.vertices_projected_estimate = 0
+        self.gjk_tests = 0
+        # Nanoseconds spent in the bounding box check and in the narrow phase of test.
+        self.bounds_ns = 0
+        self.narrow_ns = 0
+
+    def record_sat(self, shape1, shape2, axes_tested, early_exit):
+        """
+        Counts a run of the SAT algorithm between two shapes.
+        :param axes_tested: The number of axes both shapes were projected onto.
+        :param early_exit: True if the run ended on a separating axis.
+        """
+        self.sat_tests += 1
+        if early_exit:
+            self.sat_early_exits += 1
+        self.axes_tested += axes_tested
+        self.vertices_projected_estimate += axes_tested * (len(shape1) + len(shape2))
+
+    def snapshot(self, reset=False):
+        """
+        :param reset: If true, the counters are set back to 0 after being read, so every snapshot
+        covers the time since the previous one.
+        :return: A dict of the name and value of every counter.
+        """
+        values = {name: getattr(self, name) for name in self.FIELDS}
+        if reset:
+            self.reset()
+        return values
+
+
+class SeparatingAxisCache:
+    """
+    Remembers, for each pair of ConvexShape's, the index of the axis that last separated
+    them or that gave their MTV. IntersectTester tries that axis first on the next test, so
+    pairs that stay apart along the same axis are rejected after a single projection.
+    Holds at most max_size pairs and evicts the least recently used one when full.
+    """
+
+    def __init__(self, max_size=4096):
+        """
+        :param max_size: The most pairs kept at once.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1. Got: " + str(max_size))
+        self.max_size = max_size
+        self._axes = OrderedDict()
+        self._pairs_of = {}
+
+    def __len__(self):
+        return len(self._axes)
+
+    def get(self, shape1, shape2):
+        """
+        :return: The index of the cached axis for the ordered pair of shapes, or None.
+        """
+        pair = (shape1, shape2)
+        index = self._axes.get(pair)
+        if index is not None:
+            self._axes.move_to_end(pair)
+        return index
+
+    def store(self, shape1, shape2, index):
+        """
+        Caches the axis index for the ordered pair of shapes.
+        """
+        pair = (shape1, shape2)
+        if pair not in self._axes:
+            self._pairs_of.setdefault(shape1, set()).add(pair)
+            self._pairs_of.setdefault(shape2, set()).add(pair)
+        self._axes[pair] = index
+        self._axes.move_to_end(pair)
+        if len(self._axes) > self.max_size:
+            oldest = next(iter(self._axes))
+            del self._axes[oldest]
+            for shape in oldest:
+                self._forget_pair(shape, oldest)
+
+    def discard(self, shape):
+        """
+        Forgets every pair that includes the provided shape.
+        """
+        for pair in self._pairs_of.pop(shape, ()):
+            del self._axes[pair]
+            other = pair[1] if pair[0] is shape else pair[0]
+            if other is not shape:
+                self._forget_pair(other, pair)
+
+    def _forget_pair(self, shape, pair):
+        # Drops the pair from the pairs of the shape, and the shape once it has none left.
+        pairs = self._pairs_of.get(shape)
+        if pairs is not None:
+            pairs.discard(pair)
+            if not pairs:
+                del self._pairs_of[shape]
+
+    def clear(self):
+        self._axes.clear()
+        self._pairs_of.clear()
+
+
+def _is_parallel(ax, ay, bx, by):
+    """
+    :return: True if the two axes are parallel or antiparallel within PARALLEL_TOLERANCE.
+    The axes do not have to be unit vectors.
+    """
+    cross = ax * by - ay * bx
+    return cross * cross <= PARALLEL_TOLERANCE * PARALLEL_TOLERANCE * (ax * ax + ay * ay) * (bx * bx + by * by)
+
+
+def _axis_order(x, y):
+    """
+    :return: A value that increases with the angle of an axis pointing into the upper half plane,
+    from -1 at 0 degrees to 1 at 180 degrees. Cheaper than atan2 and works on axes that are not unit vectors.
+    """
+    return -x / (abs(x) + y)
+
+
+def _canonical_axes(normals):
+    """
+    Flips every normal to point into the upper half plane, sorts them by angle and drops
+    the ones that are parallel to a previous one.
+    :param normals: The edge normals of a shape.
+    :return: A tuple of the list of canonical axes and the list of their _axis_order values.
+    """
+    flipped = []
+    for normal in normals:
+        if normal.y < 0 or (normal.y == 0 and normal.x < 0):
+            normal = -normal
+        flipped.append((_axis_order(normal.x, normal.y), normal))
+    flipped.sort(key=lambda item: item[0])
+
+    axes = []
+    keys = []
+    for key, axis in flipped:
+        if axes and _is_parallel(axes[-1].x, axes[-1].y, axis.x, axis.y):
+            continue
+        axes.append(axis)
+        keys.append(key)
+
+    # Axes at both ends of the range of angles can still be antiparallel to each other.
+    if len(axes) > 1 and _is_parallel(axes[-1].x, axes[-1].y, axes[0].x, axes[0].y):
+        axes.pop()
+        keys.pop()
+    return axes, keys
+
+
+def _merge_axes(shape1, shape2):
+    """
+    Merges the canonical axes of two shapes in a single pass, dropping the axes of the second
+    shape that are parallel to an axis of the first.
+    :return: The deduplicated list of axes to test the pair of shapes on.
+    """
+    axes1 = shape1.get_axes()
+    axes2 = shape2.get_axes()
+    return _merge_axis_lists(axes1, shape1._axis_keys, axes2, shape2._axis_keys)
+
+
+def _merge_raw_axes(shape1, shape2):
+    """
+    The same as _merge_axes for the axes from get_raw_axes, which are not normalized.
+    """
+    axes1 = shape1.get_raw_axes()
+    axes2 = shape2.get_raw_axes()
+    return _merge_axis_lists(axes1, shape1._raw_axis_keys, axes2, shape2._raw_axis_keys)
+
+
+def _merge_axis_lists(axes1, keys1, axes2, keys2):
+    """
+    :return: The merged list of two lists of canonical axes, with their _axis_order values as the keys.
+    """
+    if not axes2:
+        return axes1
+    if not axes1:
+        return axes2
+
+    merged = []
+    i = 0
+    j = 0
+    count1 = len(axes1)
+    count2 = len(axes2)
+    while i < count1 or j < count2:
+        if j >= count2 or (i < count1 and keys1[i] <= keys2[j]):
+            axis = axes1[i]
+            i += 1
+        else:
+            axis = axes2[j]
+            j += 1
+        if merged:
+            last = merged[-1]
+            if _is_parallel(last.x, last.y, axis.x, axis.y):
+                continue
+        merged.append(axis)
+
+    if len(merged) > 1:
+        first = merged[0]
+        last = merged[-1]
+        if _is_parallel(last.x, last.y, first.x, first.y):
+            merged.pop()
+    return merged
+
+
+def _minkowski_point(shape1, shape2, dx, dy):
+    """
+    :return: The support point of the Minkowski difference shape1 - shape2 in the direction (dx, dy),
+    as a tuple of its x and y followed by the support points on shape1 and shape2 it was made from.
+    """
+    a = shape1.support(Vector2(dx, dy))
+    b = shape2.support(Vector2(-dx, -dy))
+    return a.x - b.x, a.y - b.y, a.x, a.y, b.x, b.y
+
+
+def _solve_simplex(simplex):
+    """
+    Finds the point of the simplex closest to the origin and drops the simplex vertices that
+    are not needed to describe it.
+    :param simplex: A list of 1 to 3 Minkowski points.
+    :return: A tuple of the reduced simplex, the x and y of the closest point, and the barycentric
+    weights of the closest point for each vertex of the reduced simplex.
+    """
+    if len(simplex) == 1:
+        a = simplex[0]
+        return simplex, a[0], a[1], (1.0,)
+
+    if len(simplex) == 2:
+        a, b = simplex
+        ex = b[0] - a[0]
+        ey = b[1] - a[1]
+        length_squared = ex * ex + ey * ey
+        t = -(a[0] * ex + a[1] * ey) / length_squared if length_squared > 0 else 0.0
+        if t <= 0:
+            return [a], a[0], a[1], (1.0,)
+        if t >= 1:
+            return [b], b[0], b[1], (1.0,)
+        return simplex, a[0] + ex * t, a[1] + ey * t, (1 - t, t)
+
+    # Closest point of a triangle to the origin, as in Ericson's Real-Time Collision Detection.
+    a, b, c = simplex
+    abx = b[0] - a[0]
+    aby = b[1] - a[1]
+    acx = c[0] - a[0]
+    acy = c[1] - a[1]
+
+    d1 = -(abx * a[0] + aby * a[1])
+    d2 = -(acx * a[0] + acy * a[1])
+    if d1 <= 0 and d2 <= 0:
+        return [a], a[0], a[1], (1.0,)
+
+    d3 = -(abx * b[0] + aby * b[1])
+    d4 = -(acx * b[0] + acy * b[1])
+    if d3 >= 0 and d4 <= d3:
+        return [b], b[0], b[1], (1.0,)
+
+    vc = d1 * d4 - d3 * d2
+    if vc <= 0 and d1 >= 0 and d3 <= 0:
+        t = d1 / (d1 - d3)
+        return [a, b], a[0] + abx * t, a[1] + aby * t, (1 - t, t)
+
+    d5 = -(abx * c[0] + aby * c[1])
+    d6 = -(acx * c[0] + acy * c[1])
+    if d6 >= 0 and d5 <= d6:
+        return [c], c[0], c[1], (1.0,)
+
+    vb = d5 * d2 - d1 * d6
+    if vb <= 0 and d2 >= 0 and d6 <= 0:
+        t = d2 / (d2 - d6)
+        return [a, c], a[0] + acx * t, a[1] + acy * t, (1 - t, t)
+
+    va = d3 * d6 - d5 * d4
+    if va <= 0 and d4 - d3 >= 0 and d5 - d6 >= 0:
+        t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        return [b, c], b[0] + (c[0] - b[0]) * t, b[1] + (c[1] - b[1]) * t, (1 - t, t)
+
+    # The origin is inside of the triangle.
+    total = va + vb + vc
+    if total == 0:
+        return simplex, 0.0, 0.0, (1.0, 0.0, 0.0)
+    return simplex, 0.0, 0.0, (va / total, vb / total, vc / total)
+
+
+def _gjk(shape1, shape2, boolean=False, max_distance=None):
+    """
+    Runs the GJK algorithm on the Minkowski difference shape1 - shape2, which contains the
+    origin exactly when the shapes intersect.
+    :param boolean: If true, returns as soon as the shapes are known to be apart instead of
+    converging on the closest point.
+    :param max_distance: Optional. Returns None as soon as the shapes are known to be further apart than this.
+    :return: A tuple of whether the shapes intersect, the final simplex, the x and y of the point of
+    the simplex closest to the origin, and the barycentric weights of that point.
+    """
+    center1 = shape1.get_bounds().get_center()
+    center2 = shape2.get_bounds().get_center()
+    dx = center1.x - center2.x
+    dy = center1.y - center2.y
+    if dx == 0 and dy == 0:
+        dx = 1.0
+
+    simplex = [_minkowski_point(shape1, shape2, dx, dy)]
+    px = py = 0.0
+    weights = (1.0,)
+    for _ in range(GJK_MAX_ITERATIONS):
+        simplex, px, py, weights = _solve_simplex(simplex)
+        if len(simplex) == 3:
+            return True, simplex, 0.0, 0.0, weights
+
+        distance_squared = px * px + py * py
+        if distance_squared <= GJK_TOLERANCE * GJK_TOLERANCE:
+            # The origin lies on the simplex, so the shapes are touching.
+            return True, simplex, px, py, weights
+
+        w = _minkowski_point(shape1, shape2, -px, -py)
+        projected = px * w[0] + py * w[1]
+        if boolean and projected > 0:
+            # Every point of the Minkowski difference is on the far side of the origin.
+            return False, simplex, px, py, weights
+        if max_distance is not None and projected > 0 \
+                and projected * projected > max_distance * max_distance * distance_squared:
+            # projected / |p| is a lower bound of the distance between the shapes.
+            return None
+        if distance_squared - projected <= GJK_TOLERANCE * distance_squared:
+            # No more progress towards the origin can be made.
+            return False, simplex, px, py, weights
+        for vertex in simplex:
+            if vertex[0] == w[0] and vertex[1] == w[1]:
+                return False, simplex, px, py, weights
+        simplex.append(w)
+
+    return False, simplex, px, py, weights
+
+
+def _epa(shape1, shape2, simplex):
+    """
+    Runs the expanding polytope algorithm, growing the final GJK simplex towards the edge of the
+    Minkowski difference closest to the origin.
+    :param simplex: The final simplex of _gjk for a pair of intersecting shapes.
+    :return: A tuple of the x and y of the unit direction to move shape2 out of shape1 along,
+    and the distance to move it.
+    """
+    polytope = list(simplex)
+
+    # Growing a simplex the origin lies on into a triangle around the origin.
+    if len(polytope) == 1:
+        a = polytope[0]
+        b = _minkowski_point(shape1, shape2, 1.0, 0.0)
+        if b[0] == a[0] and b[1] == a[1]:
+            b = _minkowski_point(shape1, shape2, -1.0, 0.0)
+        polytope.append(b)
+    if len(polytope) == 2:
+        a, b = polytope
+        nx = b[1] - a[1]
+        ny = a[0] - b[0]
+        c = _minkowski_point(shape1, shape2, nx, ny)
+        if (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0]) == 0:
+            c = _minkowski_point(shape1, shape2, -nx, -ny)
+        polytope.append(c)
+
+    # Ordering the polytope counterclockwise so (ey, -ex) is the outward normal of every edge.
+    a, b, c = polytope
+    if (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0]) < 0:
+        polytope = [a, c, b]
+
+    best_x = best_y = 0.0
+    best_distance = 0.0
+    for _ in range(EPA_MAX_ITERATIONS):
+        best_distance = float('inf')
+        best_index = 0
+        count = len(polytope)
+        for i in range(count):
+            p = polytope[i]
+            q = polytope[i + 1 if i + 1 < count else 0]
+            ex = q[0] - p[0]
+            ey = q[1] - p[1]
+            length = sqrt(ex * ex + ey * ey)
+            if length == 0:
+                continue
+            nx = ey / length
+            ny = -ex / length
+            distance = nx * p[0] + ny * p[1]
+            if distance < best_distance:
+                best_distance = distance
+                best_x = nx
+                best_y = ny
+                best_index = i + 1
+
+        w = _minkowski_point(shape1, shape2, best_x, best_y)
+        if best_x * w[0] + best_y * w[1] - best_distance <= EPA_TOLERANCE:
+            break
+        polytope.insert(best_index, w)
+
+    if best_distance == float('inf'):
+        return 0.0, 0.0, 0.0
+    return best_x, best_y, best_distance
+
+
+def _piece_pairs(shape1, shape2, overlapping):
+    """
+    Yields the pairs of convex pieces of two shapes, where a shape that is not a CompoundShape is its own piece.
+    :param overlapping: If true, only yields the pairs of pieces whose bounding boxes intersect.
+    """
+    pieces1 = shape1.get_pieces() if isinstance(shape1, CompoundShape) else (shape1,)
+    pieces2 = shape2.get_pieces() if isinstance(shape2, CompoundShape) else (shape2,)
+    for piece1 in pieces1:
+        bounds1 = piece1.get_bounds()
+        if overlapping and not bounds1.intersects_with(shape2.get_bounds()):
+            continue
+        for piece2 in pieces2:
+            if not overlapping or bounds1.intersects_with(piece2.get_bounds()):
+                yield piece1, piece2
+
+
+def _closest_points(simplex, weights):
+    """
+    :return: The x and y of the closest point on the first shape followed by the x and y of the
+    closest point on the second shape, from the final simplex and weights of _gjk.
+    """
+    x1 = y1 = x2 = y2 = 0.0
+    for vertex, weight in zip(simplex, weights):
+        x1 += vertex[2] * weight
+        y1 += vertex[3] * weight
+        x2 += vertex[4] * weight
+        y2 += vertex[5] * weight
+    return x1, y1, x2, y2
+
+
+def _core_of(shape):
+    """
+    :return: A tuple of the shape without its rounding, and the radius of its rounding.
+    """
+    if isinstance(shape, (Circle, Capsule)):
+        return shape.get_core(), shape.radius
+    return shape, 0.0
+
+
+def _circle_circle(circle1, circle2):
+    dx = circle2.center.x - circle1.center.x
+    dy = circle2.center.y - circle1.center.y
+    radius = circle1.radius + circle2.radius
+    distance_squared = dx * dx + dy * dy
+    if distance_squared > radius * radius:
+        return IntersectResult(False, Vector2(0, 0))
+    distance = sqrt(distance_squared)
+    if distance == 0:
+        return IntersectResult(True, Vector2(radius, 0))
+    depth = (radius - distance) / distance
+    return IntersectResult(True, Vector2(dx * depth, dy * depth))
+
+
+def _polygon_circle(polygon, circle):
+    """
+    SAT between a polygon and a circle, on the polygon's axes plus the axis from the closest vertex
+    to the circle's center.
+    :return: An IntersectResult whose MTV moves the circle out of the polygon.
+    """
+    centerX = circle.center.x
+    centerY = circle.center.y
+    xs = polygon._xs
+    ys = polygon._ys
+    closestX = closestY = 0.0
+    closest = float('inf')
+    for i in range(polygon._start, polygon._start + polygon._count):
+        dx = centerX - xs[i]
+        dy = centerY - ys[i]
+        distance_squared = dx * dx + dy * dy
+        if distance_squared < closest:
+            closest = distance_squared
+            closestX = dx
+            closestY = dy
+
+    axes = polygon.get_axes()
+    if closest > 0:
+        length = sqrt(closest)
+        axes = axes + [Vector2(closestX / length, closestY / length)]
+
+    overlap = float('inf')
+    n = Vector2(0, 0)
+    flip = False
+    for axis in axes:
+        p1 = polygon.project(axis)
+        p2 = circle.project(axis)
+        if not p1.overlaps(p2):
+            return IntersectResult(False, Vector2(0, 0))
+        o = IntersectTester._overlap_of(p1, p2)
+        if o < overlap:
+            overlap = o
+            n = axis
+            # Pushing the circle towards the side of the polygon its projection is centered on.
+            flip = p2.minimum + p2.maximum < p1.minimum + p1.maximum
+    if flip:
+        n = -n
+    return IntersectResult(True, n * overlap)
+
+
+def _margin_test(shape1, shape2):
+    """
+    Tests shapes by running GJK on their cores. The shapes intersect when their cores are closer
+    than the sum of their radii, or when the cores themselves intersect.
+    :return: An IntersectResult whose MTV moves shape2 out of shape1.
+    """
+    core1, radius1 = _core_of(shape1)
+    core2, radius2 = _core_of(shape2)
+    radius = radius1 + radius2
+    result = _gjk(core1, core2, max_distance=radius)
+    if result is None:
+        return IntersectResult(False, Vector2(0, 0))
+    intersecting, simplex, px, py, weights = result
+
+    if not intersecting:
+        distance = sqrt(px * px + py * py)
+        if distance > radius:
+            return IntersectResult(False, Vector2(0, 0))
+        # The closest point of core1 - core2 to the origin points from core2 to core1.
+        depth = (radius - distance) / distance
+        return IntersectResult(True, Vector2(-px * depth, -py * depth))
+
+    nx, ny, depth = _epa(core1, core2, simplex)
+    if nx == 0 and ny == 0:
+        nx = 1.0
+    return IntersectResult(True, Vector2(nx * (depth + radius), ny * (depth + radius)))
+
+
+def _best_edge(shape, nx, ny):
+    """
+    :return: The edge next to the vertex of the shape furthest along the normal that is the most
+    perpendicular to the normal, as a tuple of the x and y of its start and end.
+    """
+    xs = shape._xs
+    ys = shape._ys
+    start = shape._start
+    count = shape._count
+    i = shape._support_index(nx, ny)
+    vx = xs[start + i]
+    vy = ys[start + i]
+    j = start + (i + 1 if i + 1 < count else 0)
+    k = start + (i - 1 if i > 0 else count - 1)
+    nextX = xs[j] - vx
+    nextY = ys[j] - vy
+    prevX = xs[k] - vx
+    prevY = ys[k] - vy
+    nextLength = sqrt(nextX * nextX + nextY * nextY)
+    prevLength = sqrt(prevX * prevX + prevY * prevY)
+    # Comparing how much each edge leans towards the normal, without dividing by zero for repeated vertices.
+    if abs(nextX * nx + nextY * ny) * prevLength <= abs(prevX * nx + prevY * ny) * nextLength:
+        return vx, vy, xs[j], ys[j]
+    return xs[k], ys[k], vx, vy
+
+
+def _clip_segment(x1, y1, x2, y2, ux, uy, offset):
+    """
+    Clips a segment to the side of a line where the projection onto (ux, uy) is at least offset.
+    :return: The list of the remaining end points as (x, y) tuples.
+    """
+    d1 = ux * x1 + uy * y1 - offset
+    d2 = ux * x2 + uy * y2 - offset
+    points = []
+    if d1 >= 0:
+        points.append((x1, y1))
+    if d2 >= 0:
+        points.append((x2, y2))
+    if d1 * d2 < 0:
+        t = d1 / (d1 - d2)
+        points.append((x1 + (x2 - x1) * t, y1 + (y2 - y1) * t))
+    return points
+
+
+def _support_contact(shape1, shape2, nx, ny, max_depth):
+    """
+    :return: A list of the single ContactPoint at the vertex of the second shape deepest inside the first one.
+    """
+    point = shape2.support(Vector2(-nx, -ny))
+    depth = shape1.project(Vector2(nx, ny)).maximum - (point.x * nx + point.y * ny)
+    return [ContactPoint(point, min(max(depth, 0), max_depth))]
+
+
+def _clip_contacts(shape1, shape2, nx, ny, max_depth):
+    """
+    Builds the contact manifold of two intersecting polygons. The edge of either shape that faces the other
+    most squarely along the normal is the reference edge, the facing edge of the other shape is the incident
+    edge, and the incident edge is clipped to the sides of the reference edge. The clipped points that are
+    behind the reference edge are the contacts. When the shapes are so deep inside each other that none are,
+    the vertex of the second shape deepest inside the first one is the contact instead.
+    :param nx: The x of the contact normal, pointing from the first shape towards the second.
+    :param ny: The y of the contact normal.
+    :param max_depth: The length of the MTV. No contact is deeper than it.
+    :return: A list of up to two ContactPoint's.
+    """
+    if shape1._count < 2 or shape2._count < 2:
+        return _support_contact(shape1, shape2, nx, ny, max_depth)
+
+    edge1 = _best_edge(shape1, nx, ny)
+    edge2 = _best_edge(shape2, -nx, -ny)
+    ex1 = edge1[2] - edge1[0]
+    ey1 = edge1[3] - edge1[1]
+    ex2 = edge2[2] - edge2[0]
+    ey2 = edge2[3] - edge2[1]
+    length1 = sqrt(ex1 * ex1 + ey1 * ey1)
+    length2 = sqrt(ex2 * ex2 + ey2 * ey2)
+    if abs(ex1 * nx + ey1 * ny) * length2 <= abs(ex2 * nx + ey2 * ny) * length1:
+        reference, incident, length = edge1, edge2, length1
+        normalX, normalY = nx, ny
+    else:
+        reference, incident, length = edge2, edge1, length2
+        normalX, normalY = -nx, -ny
+    if length == 0:
+        return _support_contact(shape1, shape2, nx, ny, max_depth)
+
+    rx1, ry1, rx2, ry2 = reference
+    ux = (rx2 - rx1) / length
+    uy = (ry2 - ry1) / length
+    points = _clip_segment(incident[0], incident[1], incident[2], incident[3], ux, uy, ux * rx1 + uy * ry1)
+    if len(points) == 2:
+        points = _clip_segment(points[0][0], points[0][1], points[1][0], points[1][1],
+                               -ux, -uy, -(ux * rx2 + uy * ry2))
+
+    # The face normal of the reference edge, facing the other shape.
+    faceX = -uy
+    faceY = ux
+    if faceX * normalX + faceY * normalY < 0:
+        faceX = -faceX
+        faceY = -faceY
+    face = faceX * rx1 + faceY * ry1
+    contacts = []
+    for x, y in points:
+        depth = face - (faceX * x + faceY * y)
+        if depth >= 0:
+            contacts.append(ContactPoint(Vector2(x, y), min(depth, max_depth)))
+    if not contacts:
+        return _support_contact(shape1, shape2, nx, ny, max_depth)
+    return contacts
+
+
+def _ray_arguments(origin, direction, max_distance):
+    """
+    :return: The origin and unit direction of a ray as floats, followed by its maximum distance.
+    """
+    origin = Vector2.from_type(origin)
+    direction = Vector2.from_type(direction)
+    length = direction.magnitude()
+    if length == 0:
+        raise ValueError("The direction of a ray can not be zero.")
+    if max_distance is None:
+        max_distance = float('inf')
+    return origin.x, origin.y, direction.x / length, direction.y / length, max_distance
+
+
+def _ray_polygon(xs, ys, start, count, ox, oy, dx, dy, max_distance):
+    """
+    Clips a ray against the edges of a convex polygon with the Cyrus-Beck algorithm.
+    :return: The distance along the ray and the unit normal of the hit as a tuple of 3, or None on a miss.
+    The distance is 0 and the normal faces the ray when the ray starts inside of the polygon.
+    """
+    if count < 3:
+        return None
+    # The sign of the area tells the winding order, and so which way the edge normals face.
+    area = 0.0
+    for i in range(count):
+        j = start + i + 1 if i + 1 < count else start
+        area += xs[start + i] * ys[j] - xs[j] * ys[start + i]
+    if area == 0:
+        return None
+    sign = 1.0 if area > 0 else -1.0
+
+    near = 0.0
+    far = max_distance
+    near_x = -dx
+    near_y = -dy
+    for i in range(count):
+        j = start + i + 1 if i + 1 < count else start
+        x = xs[start + i]
+        y = ys[start + i]
+        # Outward normal of the edge, which does not need to be normalized for clipping.
+        nx = (ys[j] - y) * sign
+        ny = (x - xs[j]) * sign
+        distance = nx * (x - ox) + ny * (y - oy)
+        speed = nx * dx + ny * dy
+        if speed == 0:
+            if distance < 0:
+                return None
+        elif speed < 0:
+            t = distance / speed
+            if t > near:
+                near = t
+                near_x = nx
+                near_y = ny
+        else:
+            t = distance / speed
+            if t < far:
+                far = t
+        if near > far:
+            return None
+
+    length = sqrt(near_x * near_x + near_y * near_y)
+    return near, near_x / length, near_y / length
+
+
+def _ray_circle(cx, cy, radius, ox, oy, dx, dy, max_distance):
+    """
+    :return: The distance along the ray and the unit normal of the hit as a tuple of 3, or None on a miss.
+    The distance is 0 and the normal faces the ray when the ray starts inside of the circle.
+    """
+    mx = ox - cx
+    my = oy - cy
+    b = mx * dx + my * dy
+    c = mx * mx + my * my - radius * radius
+    if c <= 0:
+        return 0.0, -dx, -dy
+    if b > 0:
+        return None
+    discriminant = b * b - c
+    if discriminant < 0:
+        return None
+    t = -b - sqrt(discriminant)
+    if t > max_distance:
+        return None
+    return t, (mx + dx * t) / radius, (my + dy * t) / radius
+
+
+def _ray_box(bounds, ox, oy, dx, dy, max_distance):
+    """
+    :return: The distance along the ray at which it enters the bounding box, or None if it misses
+    the box within max_distance. The distance is 0 when the ray starts inside of the box.
+    """
+    near = 0.0
+    far = max_distance
+    low = bounds.x
+    high = low + bounds.width
+    if dx == 0:
+        if ox < low or ox > high:
+            return None
+    else:
+        t1 = (low - ox) / dx
+        t2 = (high - ox) / dx
+        if t1 > t2:
+            t1, t2 = t2, t1
+        if t1 > near:
+            near = t1
+        if t2 < far:
+            far = t2
+    low = bounds.y
+    high = low + bounds.height
+    if dy == 0:
+        if oy < low or oy > high:
+            return None
+    else:
+        t1 = (low - oy) / dy
+        t2 = (high - oy) / dy
+        if t1 > t2:
+            t1, t2 = t2, t1
+        if t1 > near:
+            near = t1
+        if t2 < far:
+            far = t2
+    if near > far:
+        return None
+    return near
+
+
+def _ray_result(hit, ox, oy, dx, dy, shape_id=None):
+    if hit is None:
+        return None
+    t, nx, ny = hit
+    return RaycastResult(Vector2(ox + dx * t, oy + dy * t), Vector2(nx, ny), t, shape_id)
+
+
+def sat_batch(polys_a, polys_b):
+    """
+    Runs the SAT algorithm on many pairs of polygons with NumPy. The polygons are packed into padded
+    arrays and every axis projection is done as a matrix product, so the results match calling
+    test_major on each pair without the per-pair Python overhead. The pairs are run in chunks sized by
+    SAT_BATCH_BUDGET.
+    :param polys_a: The first polygon of every pair, as ConvexShape's or lists of vertices.
+    :param polys_b: The second polygon of every pair. Must be the same length as polys_a.
+    :return: A tuple of a boolean array of shape (N,) that is true for intersecting pairs and a
+    float array of shape (N, 2) holding the MTV of each pair. The MTV is zero for pairs that do not intersect.
+    """
+    if np is None:
+        raise ImportError("sat_batch requires NumPy to be installed.")
+    if len(polys_a) != len(polys_b):
+        raise ValueError("polys_a and polys_b must be the same length. Got: " + str(len(polys_a)) + " and " +
+                         str(len(polys_b)))
+
+    count = len(polys_a)
+    if count == 0:
+        return np.zeros(0, dtype=bool), np.zeros((0, 2))
+
+    shapes_a = [_polygon_only(polygon) for polygon in polys_a]
+    shapes_b = [_polygon_only(polygon) for polygon in polys_b]
+    intersecting = np.empty(count, dtype=bool)
+    mtvs = np.empty((count, 2))
+    chunk = _batch_chunk_size(max(len(shape) for shape in shapes_a), max(len(shape) for shape in shapes_b))
+    for begin in range(0, count, chunk):
+        end = begin + chunk
+        verts_a = _pack_vertices(shapes_a[begin:end])
+        verts_b = _pack_vertices(shapes_b[begin:end])
+        intersecting[begin:end], mtvs[begin:end] = _sat_packed(verts_a, verts_b)
+    return intersecting, mtvs
+
+
+def sat_batch_indexed(store, indices_a, indices_b):
+    """
+    Runs the SAT algorithm with NumPy on pairs of polygons from a PolygonStore, chosen by their index
+    in the store. The vertices are gathered from the store with NumPy indexing instead of visiting each
+    shape, so all of the work runs inside of NumPy, which releases the GIL for its array operations.
+    This lets batches from several threads run at the same time. The store must not grow during the call.
+    :param store: The PolygonStore holding the polygons.
+    :param indices_a: The index of the first polygon of every pair, as a sequence or an integer array.
+    :param indices_b: The index of the second polygon of every pair. Must be the same length as indices_a.
+    :return: The same arrays as sat_batch.
+    """
+    if np is None:
+        raise ImportError("sat_batch_indexed requires NumPy to be installed.")
+    indices_a = np.asarray(indices_a, dtype=np.intp)
+    indices_b = np.asarray(indices_b, dtype=np.intp)
+    if indices_a.shape != indices_b.shape:
+        raise ValueError("indices_a and indices_b must be the same length. Got: " + str(len(indices_a)) +
+                         " and " + str(len(indices_b)))
+    if len(indices_a) == 0:
+        return np.zeros(0, dtype=bool), np.zeros((0, 2))
+
+    xs, ys, starts, counts = store.as_numpy()
+    count = len(indices_a)
+    intersecting = np.empty(count, dtype=bool)
+    mtvs = np.empty((count, 2))
+    chunk = _batch_chunk_size(int(counts[indices_a].max()), int(counts[indices_b].max()))
+    for begin in range(0, count, chunk):
+        end = begin + chunk
+        chunk_a = indices_a[begin:end]
+        chunk_b = indices_b[begin:end]
+        verts_a = _gather_vertices(xs, ys, starts[chunk_a], counts[chunk_a])
+        verts_b = _gather_vertices(xs, ys, starts[chunk_b], counts[chunk_b])
+        intersecting[begin:end], mtvs[begin:end] = _sat_packed(verts_a, verts_b)
+    return intersecting, mtvs
+
+
+def _batch_chunk_size(width_a, width_b):
+    """
+    :param width_a: The most vertices of a first polygon of the pairs.
+    :param width_b: The most vertices of a second polygon of the pairs.
+    :return: How many pairs _sat_packed can run at a time within SAT_BATCH_BUDGET. Every pair projects
+    the vertices of both polygons onto the axes of both polygons.
+    """
+    return max(1, SAT_BATCH_BUDGET // ((width_a + width_b) * (width_a + width_b)))
+
+
+def _sat_packed(verts_a, verts_b):
+    """
+    The NumPy SAT kernel shared by sat_batch and sat_batch_indexed.
+    :param verts_a: The first polygon of every pair, packed by _pack_vertices.
+    :param verts_b: The second polygon of every pair, packed by _pack_vertices.
+    """
+    count = len(verts_a)
+
+    # Edge normals of both polygons. Padding edges have zero length and are masked out.
+    axes = np.concatenate((_edge_normals(verts_a), _edge_normals(verts_b)), axis=1)
+    lengths = np.sqrt(np.sum(axes * axes, axis=2))
+    valid = lengths > 0
+    axes = np.divide(axes, lengths[:, :, np.newaxis], out=np.zeros_like(axes), where=valid[:, :, np.newaxis])
+
+    axes_t = axes.transpose(0, 2, 1)
+    proj_a = np.matmul(verts_a, axes_t)
+    proj_b = np.matmul(verts_b, axes_t)
+    min_a = proj_a.min(axis=1)
+    max_a = proj_a.max(axis=1)
+    min_b = proj_b.min(axis=1)
+    max_b = proj_b.max(axis=1)
+
+    overlap = np.minimum(max_a, max_b) - np.maximum(min_a, min_b)
+    intersecting = ~np.any((overlap < 0) & valid, axis=1)
+
+    # Containment adjustment, as in test_major.
+    contained = ((min_b > min_a) & (max_b < max_a)) | ((min_a > min_b) & (max_a < max_b))
+    adjustment = np.minimum(np.abs(min_a - min_b), np.abs(max_a - max_b))
+    overlap = np.where(contained, overlap + adjustment, overlap)
+    overlap = np.where(valid, overlap, np.inf)
+
+    rows = np.arange(count)
+    best = np.argmin(overlap, axis=1)
+    depth = overlap[rows, best]
+    n = axes[rows, best]
+
+    center_a = (verts_a.min(axis=1) + verts_a.max(axis=1)) / 2
+    center_b = (verts_b.min(axis=1) + verts_b.max(axis=1)) / 2
+    flip = np.sum((center_b - center_a) * n, axis=1) < 0
+    n[flip] = -n[flip]
+
+    mtv = np.where(intersecting[:, np.newaxis], n * depth[:, np.newaxis], 0.0)
+    return intersecting, mtv
+
+
+def _polygon_only(polygon):
+    shape = to_polygon(polygon)
+    if not isinstance(shape, ConvexShape):
+        raise TypeError("sat_batch only supports polygons. Got: " + type(shape).__name__)
+    return shape
+
+
+def _pack_vertices(shapes):
+    """
+    :param shapes: A list of ConvexShape's.
+    :return: An array of shape (N, V, 2) with the vertices of every shape. Shapes with fewer than
+    V vertices are padded by repeating their last vertex, which does not change their projections.
+    """
+    store = shapes[0]._store
+    if store is not None and all(shape._store is store for shape in shapes):
+        # Gathering straight from the store's arrays without visiting every shape's vertices in Python.
+        starts = np.fromiter((shape._start for shape in shapes), dtype=np.intp, count=len(shapes))
+        counts = np.fromiter((shape._count for shape in shapes), dtype=np.intp, count=len(shapes))
+        xs = np.frombuffer(store.xs, dtype=np.float64)
+        ys = np.frombuffer(store.ys, dtype=np.float64)
+        return _gather_vertices(xs, ys, starts, counts)
+
+    width = max(len(shape) for shape in shapes)
+    packed = np.empty((len(shapes), width, 2))
+    for i, shape in enumerate(shapes):
+        start = shape._start
+        count = shape._count
+        packed[i, :count, 0] = np.frombuffer(shape._xs, dtype=np.float64)[start:start + count]
+        packed[i, :count, 1] = np.frombuffer(shape._ys, dtype=np.float64)[start:start + count]
+        packed[i, count:] = packed[i, count - 1]
+    return packed
+
+
+def _gather_vertices(xs, ys, starts, counts):
+    """
+    Packs polygons from contiguous vertex arrays the same way as _pack_vertices.
+    :param xs: The x coordinates of every vertex.
+    :param ys: The y coordinates of every vertex.
+    :param starts: The index of the first vertex of every polygon.
+    :param counts: The number of vertices of every polygon.
+    """
+    columns = np.minimum(np.arange(counts.max()), counts[:, np.newaxis] - 1)
+    indices = starts[:, np.newaxis] + columns
+    return np.stack((xs[indices], ys[indices]), axis=2)
+
+
+def _edge_normals(packed):
+    """
+    :param packed: Vertices packed by _pack_vertices.
+    :return: The unnormalized edge normals of every packed polygon, including the closing edge.
+    """
+    edges = packed - np.roll(packed, -1, axis=1)
+    return np.stack((edges[:, :, 1], -edges[:, :, 0]), axis=2)
+
+
+class BoundingBox:
+    """
+    Represents an axis-aligned BoundingBox - AABB.
+    Consists of an x and a y coordinate representing the top
+    left corner of the box, and a width and height
+    value for the width and height of the bounding box.
+    """
+
+    def __init__(self, x, y, width, height):
+        """
+        Creates an instance of BoundingBox.
+        :param x: x coordinate of the top left corner of the bounding box.
+        :param y: y coordinate of the top left corner of the bounding box.
+        :param width: Width of the bounding box.
+        :param height: Height of the bounding box.
+        """
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def __repr__(self):
+        """
+        :rtype: str
+        """
+        return "Bounding Box(X: " + str(self.x) + " Y: " + str(self.y) + " Width: " + str(self.width) + \
+               " Height: " + str(self.height) + ")"
+
+    def __eq__(self, other):
+        return self.x == other.x and self.y == other.y and self.height == other.height and self.width == other.width
+
+    def intersects_with(self, other):
+        """
+        Checks for an intersection between itself and the other provided bounding box.
+        :param other: The other bounding box to if intersecting. Will raise a
+        TypeError if 'other' is not a BoundingBox.
+        :return: A boolean - true for an intersection.
+        :rtype:
+        """
+        # Type checking to throw an error if the user inputted something other than a BoundingBox
+        # otherwise Python will throw it's own vague error.
+        if not isinstance(other, BoundingBox):
+            raise TypeError("Incorrect type for parameter 'other'. Expected a BoundingBox not: " + type(other).__name__)
+
+        return self.x < other.x + other.width \
+               and self.x + self.width > other.x \
+               and self.y < other.y + other.height \
+               and self.y + self.height > other.y
+
+    def contains(self, other):
+        """
+        :param other: Another BoundingBox.
+        :return: True if the other bounding box lies completely inside of this one.
+        """
+        return self.x <= other.x and self.y <= other.y \
+               and other.x + other.width <= self.x + self.width \
+               and other.y + other.height <= self.y + self.height
+
+    def contains_point(self, x, y):
+        """
+        :return: True if the point lies inside of or on the edge of the bounding box.
+        """
+        return self.x <= x <= self.x + self.width and self.y <= y <= self.y + self.height
+
+    def union(self, other):
+        """
+        :param other: Another BoundingBox.
+        :return: The smallest BoundingBox containing both bounding boxes.
+        """
+        x = min(self.x, other.x)
+        y = min(self.y, other.y)
+        return BoundingBox(x, y, max(self.x + self.width, other.x + other.width) - x,
+                           max(self.y + self.height, other.y + other.height) - y)
+
+    def expanded(self, margin):
+        """
+        :param margin: The distance to grow each side of the bounding box by.
+        :return: A new BoundingBox grown by the margin on every side.
+        """
+        return BoundingBox(self.x - margin, self.y - margin, self.width + margin * 2, self.height + margin * 2)
+
+    def perimeter(self):
+        return 2 * (self.width + self.height)
+
+    def corners(self):
+        return [Vector2(self.x, self.y), Vector2(self.x + self.width, self.y),
+                Vector2(self.x + self.width, self.y + self.height), Vector2(self.x, self.y + self.height),
+                Vector2(self.x, self.y)]
+
+    def get_center(self):
+        return Vector2(self.x + (self.width / 2), self.y + (self.height / 2))
+
+    @staticmethod
+    def generate_bounds_from(pol1):
+        """
+        Creates a bounding box from the inputted polygon.
+        :param pol1: The polygon represented by list of vertices, or a ConvexShape, Circle, Capsule or CompoundShape.
+        :return: An axis-aligned bounding box from the provided shape. Never the cached box of a shape itself.
+        """
+        if isinstance(pol1, (ConvexShape, Circle, Capsule, CompoundShape)):
+            bounds = pol1.get_bounds()
+            return BoundingBox(bounds.x, bounds.y, bounds.width, bounds.height)
+
+        xs, ys = _vertex_arrays(pol1)
+        if len(xs) == 0:
+            return BoundingBox(0, 0, 0, 0)
+        min_x = min(xs)
+        min_y = min(ys)
+        return BoundingBox(min_x, min_y, max(xs) - min_x, max(ys) - min_y)
+
+
+class ConvexShape:
+    """
+    A convex polygon that is converted once and reused across many tests.
+    The vertices are stored as flat arrays of x and y coordinates, and the edge normals
+    and bounding box are only computed when first needed. They stay cached until the
+    shape is changed through set_vertices or translate.
+    A shape either owns its arrays or is a view into the shared arrays of a PolygonStore,
+    in which case its vertices are the count values starting at its start index.
+    """
+
+    def __init__(self, vertices):
+        """
+        Creates a ConvexShape from the provided vertices.
+        :param vertices: The vertices of the convex polygon as tuples, Vector2's or Points. A closing
+        vertex that repeats the first vertex is dropped as the shape is always treated as closed.
+        """
+        self._xs = array('d')
+        self._ys = array('d')
+        self._start = 0
+        self._count = 0
+        self._store = None
+        self._clear_cache()
+        # Incremented every time the geometry changes.
+        self.version = 0
+        self.set_vertices(vertices)
+
+    def __repr__(self):
+        return "ConvexShape(" + str(list(self)) + ")"
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("ConvexShape index out of range: " + str(index))
+        return Vector2(self._xs[self._start + index], self._ys[self._start + index])
+
+    def __iter__(self):
+        xs = self._xs
+        ys = self._ys
+        for i in range(self._start, self._start + self._count):
+            yield Vector2(xs[i], ys[i])
+
+    @classmethod
+    def from_polygon(cls, polygon):
+        """
+        Like to_polygon, but creates an instance of cls for polygons that are not already a ConvexShape.
+        :param polygon: A ConvexShape or a list of vertices.
+        :return: The polygon itself if it already is a ConvexShape, otherwise a new ConvexShape made from it.
+        """
+        if isinstance(polygon, ConvexShape):
+            return polygon
+        return cls(polygon)
+
+    def _clear_cache(self):
+        self._raw_normals = None
+        self._normals = None
+        self._axes = None
+        self._axis_keys = None
+        self._raw_axes = None
+        self._raw_axis_keys = None
+        self._bounds = None
+        # The extreme vertices of the last projection, used to warm start the next one.
+        self._min_index = 0
+        self._max_index = 0
+
+    def set_vertices(self, vertices):
+        """
+        Replaces the vertices of the shape and clears the cached normals and bounds.
+        A shape in a PolygonStore is rewritten in place when the number of vertices is unchanged,
+        and moved to the end of the store's arrays otherwise.
+        :param vertices: The new vertices of the convex polygon.
+        """
+        xs, ys = _vertex_arrays(vertices)
+        if self._store is None:
+            self._xs = xs
+            self._ys = ys
+            self._count = len(xs)
+        else:
+            self._store._write(self, xs, ys)
+        self._clear_cache()
+        self.version += 1
+
+    def translate(self, dx, dy):
+        """
+        Moves the shape by the provided offset. The cached normals stay valid and
+        the cached bounding box is moved along with the shape.
+        :param dx: Offset along the x axis.
+        :param dy: Offset along the y axis.
+        """
+        xs = self._xs
+        ys = self._ys
+        for i in range(self._start, self._start + self._count):
+            xs[i] += dx
+            ys[i] += dy
+
+        if self._bounds is not None:
+            self._bounds.x += dx
+            self._bounds.y += dy
+        self.version += 1
+
+    def get_raw_normals(self):
+        """
+        :return: The normals of every edge as long as the edge itself, including the closing edge.
+        Edges of zero length are skipped. The returned list is cached and should not be modified.
+        """
+        if self._raw_normals is None:
+            xs = self._xs
+            ys = self._ys
+            start = self._start
+            count = self._count
+            normals = []
+            for i in range(count if count > 2 else count - 1):
+                j = start + i + 1 if i + 1 < count else start
+                edgeX = xs[start + i] - xs[j]
+                edgeY = ys[start + i] - ys[j]
+                if edgeX == 0 and edgeY == 0:
+                    continue
+                normals.append(Vector2(edgeY, -edgeX))
+            self._raw_normals = normals
+        return self._raw_normals
+
+    def get_normals(self):
+        """
+        :return: The unit normals of every edge, including the closing edge. Edges of zero
+        length are skipped. The returned list is cached and should not be modified.
+        """
+        if self._normals is None:
+            self._normals = [normal.normalized() for normal in self.get_raw_normals()]
+        return self._normals
+
+    def get_axes(self):
+        """
+        :return: The unit edge normals with parallel and antiparallel ones removed, flipped to point
+        into the upper half plane and sorted by angle. A rectangle has 2 axes and a regular hexagon 3.
+        The returned list is cached and should not be modified.
+        """
+        if self._axes is None:
+            self._axes, self._axis_keys = _canonical_axes(self.get_normals())
+        return self._axes
+
+    def get_raw_axes(self):
+        """
+        :return: The same axes as get_axes, in the same order, but not normalized. Enough to tell whether
+        projections overlap without a square root per edge. The returned list is cached and should not be modified.
+        """
+        if self._raw_axes is None:
+            self._raw_axes, self._raw_axis_keys = _canonical_axes(self.get_raw_normals())
+        return self._raw_axes
+
+    def get_bounds(self):
+        """
+        :return: The axis-aligned bounding box of the shape. The returned BoundingBox
+        is cached and should not be modified.
+        """
+        if self._bounds is None:
+            if self._count == 0:
+                self._bounds = BoundingBox(0, 0, 0, 0)
+            else:
+                end = self._start + self._count
+                xs = self._xs[self._start:end]
+                ys = self._ys[self._start:end]
+                min_x = min(xs)
+                min_y = min(ys)
+                self._bounds = BoundingBox(min_x, min_y, max(xs) - min_x, max(ys) - min_y)
+        return self._bounds
+
+    def project(self, axis):
+        """
+        Makes a Projection of the shape onto the provided axis.
+        :param axis: The Axis to project the shape onto.
+        :return: A ShapeProjection.
+        """
+        xs = self._xs
+        ys = self._ys
+        start = self._start
+        axisX = axis.x
+        axisY = axis.y
+
+        if self._count >= HILL_CLIMB_THRESHOLD:
+            high = start + self._extreme_index(axisX, axisY, self._max_index)
+            low = start + self._extreme_index(-axisX, -axisY, self._min_index)
+            self._max_index = high - start
+            self._min_index = low - start
+            return ShapeProjection(axisX * xs[low] + axisY * ys[low], axisX * xs[high] + axisY * ys[high])
+
+        minimum = maximum = axisX * xs[start] + axisY * ys[start]
+        for i in range(start + 1, start + self._count):
+            p = axisX * xs[i] + axisY * ys[i]
+            if p < minimum:
+                minimum = p
+            elif p > maximum:
+                maximum = p
+        return ShapeProjection(minimum, maximum)
+
+    def support(self, direction):
+        """
+        :param direction: The direction to search along. Does not need to be a unit vector.
+        :return: The vertex of the shape furthest along the direction, as a Vector2.
+        """
+        best = self._start + self._support_index(direction.x, direction.y)
+        return Vector2(self._xs[best], self._ys[best])
+
+    def _support_index(self, directionX, directionY):
+        """
+        :return: The index of the vertex furthest along the direction, counted from the first vertex of the shape.
+        """
+        if self._count >= HILL_CLIMB_THRESHOLD:
+            self._max_index = self._extreme_index(directionX, directionY, self._max_index)
+            return self._max_index
+        xs = self._xs
+        ys = self._ys
+        start = self._start
+        best = start
+        highest = directionX * xs[start] + directionY * ys[start]
+        for i in range(start + 1, start + self._count):
+            p = directionX * xs[i] + directionY * ys[i]
+            if p > highest:
+                highest = p
+                best = i
+        return best - start
+
+    def raycast(self, origin, direction, max_distance=None):
+        """
+        Casts a ray against the polygon by clipping it against every edge.
+        :param origin: The start of the ray.
+        :param direction: The direction of the ray. Does not have to be a unit vector.
+        :param max_distance: Optional. How far the ray reaches. Defaults to no limit.
+        :return: A RaycastResult, or None when the ray misses. A ray that starts inside of the polygon
+        hits it at a distance of 0. Polygons without an area are never hit.
+        """
+        ox, oy, dx, dy, max_distance = _ray_arguments(origin, direction, max_distance)
+        hit = _ray_polygon(self._xs, self._ys, self._start, self._count, ox, oy, dx, dy, max_distance)
+        return _ray_result(hit, ox, oy, dx, dy)
+
+    def _extreme_index(self, axisX, axisY, start):
+        """
+        Finds the vertex furthest along the axis by climbing from the start vertex towards larger
+        projections. As the shape is convex the projections of its vertices only rise and fall once
+        around the ring, so the first peak found is the highest. Starting from the extreme vertex of
+        a nearby axis usually reaches the peak in a few steps.
+        :return: The index of the vertex furthest along the axis, counted from the first vertex of the shape.
+        """
+        xs = self._xs
+        ys = self._ys
+        offset = self._start
+        count = self._count
+        i = start if start < count else 0
+        best = axisX * xs[offset + i] + axisY * ys[offset + i]
+
+        j = i + 1 if i + 1 < count else 0
+        value = axisX * xs[offset + j] + axisY * ys[offset + j]
+        step = 1
+        if value < best:
+            j = i - 1 if i > 0 else count - 1
+            value = axisX * xs[offset + j] + axisY * ys[offset + j]
+            if value <= best:
+                return i
+            step = -1
+
+        # Equal values are walked over, as an edge perpendicular to the axis can be climbed along.
+        for _ in range(count):
+            if value < best:
+                break
+            i = j
+            best = value
+            j = (i + step) % count
+            value = axisX * xs[offset + j] + axisY * ys[offset + j]
+        return i
+
+
+def to_polygon(polygon):
+    """
+    Converts any supported polygon into the internal representation used by every test.
+    Call it once where polygons enter your code, and pass the result around instead of the
+    original list, so vertices are not converted again on every test.
+    :param polygon: A ConvexShape, Circle, Capsule or CompoundShape, a list or tuple of vertices of any type with a
+    registered vertex adapter (tuples, lists, Vector2's, Points...) or a NumPy array of shape (N, 2).
+    :return: The polygon itself if it already is a shape, otherwise a new ConvexShape made from it.
+    """
+    if isinstance(polygon, (ConvexShape, Circle, Capsule, CompoundShape)):
+        return polygon
+    return ConvexShape(polygon)
+
+
+def register_vertex_adapter(vertex_type, adapter):
+    """
+    Lets polygons be made of vertices of a new type. Subclasses of the type are supported too.
+    :param vertex_type: The class of the vertices.
+    :param adapter: A function taking a vertex and returning its x and y coordinates as a tuple.
+    """
+    _VERTEX_ADAPTERS[vertex_type] = adapter
+    _REGISTERED_ADAPTERS[vertex_type] = adapter
+
+
+def _coordinates_of_sequence(vertex):
+    return vertex[0], vertex[1]
+
+
+def _coordinates_of_attributes(vertex):
+    return vertex.x, vertex.y
+
+
+# Adapters registered by the user or found for subclasses, looked up by the exact type of a vertex.
+_VERTEX_ADAPTERS = {}
+# Adapters registered by the user, checked with issubclass when a type has no entry in _VERTEX_ADAPTERS.
+_REGISTERED_ADAPTERS = {}
+
+
+def _find_vertex_adapter(vertex_type):
+    """
+    :return: The adapter for the type of vertex. Raises a TypeError if there is none.
+    """
+    adapter = _VERTEX_ADAPTERS.get(vertex_type)
+    if adapter is not None:
+        return adapter
+
+    # graphics.py opens a window when imported, so its Point is only registered once something else imported it.
+    if 'graphics' in sys.modules:
+        point_type = getattr(sys.modules['graphics'], 'Point', None)
+        if point_type is not None and point_type not in _REGISTERED_ADAPTERS:
+            register_vertex_adapter(point_type, _coordinates_of_attributes)
+
+    for registered_type, adapter in list(_REGISTERED_ADAPTERS.items()):
+        if issubclass(vertex_type, registered_type):
+            _VERTEX_ADAPTERS[vertex_type] = adapter
+            return adapter
+
+    raise TypeError("Inputted vertex is not a tuple, Vector2, Point or registered vertex type! Got: " +
+                    vertex_type.__name__)
+
+
+def _vertex_arrays(vertices):
+    """
+    Converts vertices into flat arrays of x and y coordinates, dropping vertices that repeat the one before them
+    and a closing vertex that repeats the first one. Repeated vertices would make edges of zero length, which stop
+    the hill climb of ConvexShape.project early.
+    The adapter of each vertex is looked up once per run of vertices of the same type.
+    :return: A tuple of the x and y arrays.
+    """
+    if np is not None and isinstance(vertices, np.ndarray):
+        coordinates = np.ascontiguousarray(vertices, dtype=np.float64).reshape(-1, 2)
+        xs = array('d', coordinates[:, 0].tobytes())
+        ys = array('d', coordinates[:, 1].tobytes())
+    else:
+        xs = array('d')
+        ys = array('d')
+        last_type = None
+        adapter = None
+        for vertex in vertices:
+            vertex_type = type(vertex)
+            if vertex_type is not last_type:
+                adapter = _find_vertex_adapter(vertex_type)
+                last_type = vertex_type
+            x, y = adapter(vertex)
+            xs.append(x)
+            ys.append(y)
+
+    for i in range(1, len(xs)):
+        if xs[i] == xs[i - 1] and ys[i] == ys[i - 1]:
+            keep = [0] + [j for j in range(1, len(xs)) if xs[j] != xs[j - 1] or ys[j] != ys[j - 1]]
+            xs = array('d', [xs[j] for j in keep])
+            ys = array('d', [ys[j] for j in keep])
+            break
+
+    while len(xs) > 1 and xs[0] == xs[-1] and ys[0] == ys[-1]:
+        xs.pop()
+        ys.pop()
+    return xs, ys
+
+
+class OrientedBox(ConvexShape):
+    """
+    A rectangle rotated around its center. Its projections are worked out from its center
+    and half extents instead of its vertices, and it only ever has 2 axes, so a test between
+    two boxes projects onto at most 4 axes.
+    Change it through translate and set_angle rather than set_vertices.
+    """
+
+    def __init__(self, center, half_width, half_height, angle=0.0):
+        """
+        :param center: The center of the box.
+        :param half_width: Half of the width of the box, along its rotated x axis.
+        :param half_height: Half of the height of the box, along its rotated y axis.
+        :param angle: The rotation of the box in radians.
+        """
+        center = Vector2.from_type(center)
+        self.center = Vector2(center.x, center.y)
+        self.half_width = half_width
+        self.half_height = half_height
+        self.angle = angle
+        ConvexShape.__init__(self, self._corners())
+
+    def __repr__(self):
+        return "OrientedBox(Center: " + str(self.center) + " Half Width: " + str(self.half_width) + \
+               " Half Height: " + str(self.half_height) + " Angle: " + str(self.angle) + ")"
+
+    def _corners(self):
+        c = cos(self.angle)
+        s = sin(self.angle)
+        ux = c * self.half_width
+        uy = s * self.half_width
+        vx = -s * self.half_height
+        vy = c * self.half_height
+        x = self.center.x
+        y = self.center.y
+        return [(x - ux - vx, y - uy - vy), (x + ux - vx, y + uy - vy),
+                (x + ux + vx, y + uy + vy), (x - ux + vx, y - uy + vy)]
+
+    def set_angle(self, angle):
+        """
+        Rotates the box to the provided angle in radians.
+        """
+        self.angle = angle
+        self.set_vertices(self._corners())
+
+    def translate(self, dx, dy):
+        self.center.x += dx
+        self.center.y += dy
+        ConvexShape.translate(self, dx, dy)
+
+    def get_axes(self):
+        if self._axes is None:
+            c = cos(self.angle)
+            s = sin(self.angle)
+            self._axes, self._axis_keys = _canonical_axes([Vector2(c, s), Vector2(-s, c)])
+        return self._axes
+
+    def get_raw_axes(self):
+        # The axes of a box are unit vectors already.
+        axes = self.get_axes()
+        self._raw_axis_keys = self._axis_keys
+        return axes
+
+    def project(self, axis):
+        """
+        Makes a Projection of the box onto the provided axis from its center and half extents.
+        :param axis: The Axis to project the box onto.
+        :return: A ShapeProjection.
+        """
+        c = cos(self.angle)
+        s = sin(self.angle)
+        middle = self.center.x * axis.x + self.center.y * axis.y
+        extent = self.half_width * abs(c * axis.x + s * axis.y) + self.half_height * abs(c * axis.y - s * axis.x)
+        return ShapeProjection(middle - extent, middle + extent)
+
+
+class TransformedShape(ConvexShape):
+    """
+    A convex polygon defined in its own local space and placed in the world by a position, a rotation
+    and a uniform scale. The local normals are only rotated again when the rotation or scale changes,
+    so moving the shape is O(1): the cached bounding box is moved along and nothing else is recomputed.
+    Projections are worked out on the local vertices with the axis turned into local space, so the world
+    space vertices are only made when something reads them, such as indexing or contact clipping.
+    """
+
+    def __init__(self, vertices, position=(0, 0), rotation=0.0, scale=1.0):
+        """
+        :param vertices: The vertices of the convex polygon in local space, around the origin the shape
+        rotates and scales about.
+        :param position: Where the local origin is placed in the world.
+        :param rotation: The rotation of the shape in radians.
+        :param scale: The uniform scale of the shape. Must be positive.
+        """
+        position = Vector2.from_type(position)
+        self.position = Vector2(position.x, position.y)
+        self.rotation = rotation
+        self._cos = cos(rotation)
+        self._sin = sin(rotation)
+        self._check_scale(scale)
+        self.scale = scale
+        self._world_xs = array('d')
+        self._world_ys = array('d')
+        self._start = 0
+        self._store = None
+        self.version = 0
+        self.set_vertices(vertices)
+
+    def __repr__(self):
+        return "TransformedShape(" + str(list(self._local)) + " Position: " + str(self.position) + \
+               " Rotation: " + str(self.rotation) + " Scale: " + str(self.scale) + ")"
+
+    @staticmethod
+    def _check_scale(scale):
+        if scale <= 0:
+            raise ValueError("scale must be positive. Got: " + str(scale))
+
+    # The world space vertices, made from the local vertices the first time they are read after a change.
+    @property
+    def _xs(self):
+        if not self._world_valid:
+            self._update_world()
+        return self._world_xs
+
+    @property
+    def _ys(self):
+        if not self._world_valid:
+            self._update_world()
+        return self._world_ys
+
+    def _update_world(self):
+        local = self._local
+        xs = local._xs
+        ys = local._ys
+        c = self._cos * self.scale
+        s = self._sin * self.scale
+        x = self.position.x
+        y = self.position.y
+        self._world_xs = array('d', (x + c * xs[i] - s * ys[i] for i in range(local._count)))
+        self._world_ys = array('d', (y + s * xs[i] + c * ys[i] for i in range(local._count)))
+        self._world_valid = True
+
+    def _clear_cache(self):
+        ConvexShape._clear_cache(self)
+        self._world_valid = False
+
+    def set_vertices(self, vertices):
+        """
+        Replaces the local vertices of the shape and clears everything cached from them.
+        :param vertices: The new vertices of the convex polygon in local space.
+        """
+        self._local = ConvexShape(vertices)
+        self._count = self._local._count
+        self._clear_cache()
+        self.version += 1
+
+    def get_local_shape(self):
+        """
+        :return: The shape in local space as a ConvexShape. Should not be modified.
+        """
+        return self._local
+
+    def translate(self, dx, dy):
+        """
+        Moves the shape by the provided offset in O(1). The cached normals stay valid and the cached bounding
+        box is moved along with the shape. The world space vertices are made again when next read.
+        :param dx: Offset along the x axis.
+        :param dy: Offset along the y axis.
+        """
+        self.position.x += dx
+        self.position.y += dy
+        if self._bounds is not None:
+            self._bounds.x += dx
+            self._bounds.y += dy
+        self._world_valid = False
+        self.version += 1
+
+    def set_position(self, position):
+        """
+        Moves the local origin of the shape to the provided position in O(1), see translate.
+        """
+        position = Vector2.from_type(position)
+        self.translate(position.x - self.position.x, position.y - self.position.y)
+
+    def set_rotation(self, rotation):
+        """
+        Rotates the shape to the provided angle in radians. The normals are rotated again when next needed.
+        """
+        self.rotation = rotation
+        self._cos = cos(rotation)
+        self._sin = sin(rotation)
+        self._clear_cache()
+        self.version += 1
+
+    def set_scale(self, scale):
+        """
+        Scales the shape to the provided uniform scale. The normals are made again when next needed.
+        """
+        self._check_scale(scale)
+        self.scale = scale
+        self._clear_cache()
+        self.version += 1
+
+    def set_transform(self, position, rotation, scale=1.0):
+        """
+        Sets the whole transform at once, keeping the cached normals when only the position changed.
+        """
+        if rotation != self.rotation or scale != self.scale:
+            self._check_scale(scale)
+            self.rotation = rotation
+            self._cos = cos(rotation)
+            self._sin = sin(rotation)
+            self.scale = scale
+            self._clear_cache()
+            self.version += 1
+        self.set_position(position)
+
+    def get_raw_normals(self):
+        """
+        :return: The local edge normals of get_local_shape rotated and scaled into the world.
+        The returned list is cached and should not be modified.
+        """
+        if self._raw_normals is None:
+            c = self._cos * self.scale
+            s = self._sin * self.scale
+            self._raw_normals = [Vector2(c * normal.x - s * normal.y, s * normal.x + c * normal.y)
+                                 for normal in self._local.get_raw_normals()]
+        return self._raw_normals
+
+    def get_normals(self):
+        """
+        :return: The unit local edge normals of get_local_shape rotated into the world.
+        The returned list is cached and should not be modified.
+        """
+        if self._normals is None:
+            c = self._cos
+            s = self._sin
+            self._normals = [Vector2(c * normal.x - s * normal.y, s * normal.x + c * normal.y)
+                             for normal in self._local.get_normals()]
+        return self._normals
+
+    def get_bounds(self):
+        """
+        :return: The axis-aligned bounding box of the shape, found by projecting it onto the x and y axes.
+        The returned BoundingBox is cached and should not be modified.
+        """
+        if self._bounds is None:
+            if self._count == 0:
+                self._bounds = BoundingBox(self.position.x, self.position.y, 0, 0)
+            else:
+                x = self.project(Vector2(1, 0))
+                y = self.project(Vector2(0, 1))
+                self._bounds = BoundingBox(x.minimum, y.minimum, x.maximum - x.minimum, y.maximum - y.minimum)
+        return self._bounds
+
+    def _local_axis(self, axisX, axisY):
+        """
+        :return: The x and y of the axis turned into local space, so a local projection onto it
+        equals the world projection onto the axis without the position.
+        """
+        c = self._cos * self.scale
+        s = self._sin * self.scale
+        return c * axisX + s * axisY, c * axisY - s * axisX
+
+    def project(self, axis):
+        """
+        Makes a Projection of the shape onto the provided axis from its local vertices.
+        :param axis: The Axis to project the shape onto.
+        :return: A ShapeProjection.
+        """
+        localX, localY = self._local_axis(axis.x, axis.y)
+        projection = self._local.project(Vector2(localX, localY))
+        offset = self.position.x * axis.x + self.position.y * axis.y
+        return ShapeProjection(projection.minimum + offset, projection.maximum + offset)
+
+    def _support_index(self, directionX, directionY):
+        return self._local._support_index(*self._local_axis(directionX, directionY))
+
+
+class Circle:
+    """
+    A circle, described by its center and radius instead of vertices.
+    """
+
+    def __init__(self, center, radius):
+        """
+        :param center: The center of the circle.
+        :param radius: The radius of the circle.
+        """
+        center = Vector2.from_type(center)
+        self.center = Vector2(center.x, center.y)
+        self.radius = radius
+        self._bounds = None
+        self._core = None
+        # Incremented every time the geometry changes.
+        self.version = 0
+
+    def __repr__(self):
+        return "Circle(Center: " + str(self.center) + " Radius: " + str(self.radius) + ")"
+
+    def set_radius(self, radius):
+        self.radius = radius
+        self._bounds = None
+        self.version += 1
+
+    def translate(self, dx, dy):
+        """
+        Moves the circle by the provided offset.
+        """
+        self.center.x += dx
+        self.center.y += dy
+        if self._bounds is not None:
+            self._bounds.x += dx
+            self._bounds.y += dy
+        if self._core is not None:
+            self._core.translate(dx, dy)
+        self.version += 1
+
+    def get_bounds(self):
+        """
+        :return: The axis-aligned bounding box of the circle. Cached and should not be modified.
+        """
+        if self._bounds is None:
+            radius = self.radius
+            self._bounds = BoundingBox(self.center.x - radius, self.center.y - radius, radius * 2, radius * 2)
+        return self._bounds
+
+    def get_core(self):
+        """
+        :return: The center of the circle as a ConvexShape with a single vertex.
+        """
+        if self._core is None:
+            self._core = ConvexShape([self.center])
+        return self._core
+
+    def project(self, axis):
+        """
+        :param axis: The unit Axis to project the circle onto.
+        :return: A ShapeProjection.
+        """
+        middle = self.center.x * axis.x + self.center.y * axis.y
+        return ShapeProjection(middle - self.radius, middle + self.radius)
+
+    def support(self, direction):
+        """
+        :return: The point of the circle furthest along the direction, as a Vector2.
+        """
+        length = direction.magnitude()
+        if length == 0:
+            return Vector2(self.center.x, self.center.y)
+        scale = self.radius / length
+        return Vector2(self.center.x + direction.x * scale, self.center.y + direction.y * scale)
+
+    def raycast(self, origin, direction, max_distance=None):
+        """
+        Casts a ray against the circle.
+        :param origin: The start of the ray.
+        :param direction: The direction of the ray. Does not have to be a unit vector.
+        :param max_distance: Optional. How far the ray reaches. Defaults to no limit.
+        :return: A RaycastResult, or None when the ray misses. A ray that starts inside of the circle
+        hits it at a distance of 0.
+        """
+        ox, oy, dx, dy, max_distance = _ray_arguments(origin, direction, max_distance)
+        hit = _ray_circle(self.center.x, self.center.y, self.radius, ox, oy, dx, dy, max_distance)
+        return _ray_result(hit, ox, oy, dx, dy)
+
+
+class Capsule:
+    """
+    A capsule, which is every point within radius of the segment between point1 and point2.
+    """
+
+    def __init__(self, point1, point2, radius):
+        """
+        :param point1: One end of the capsule's segment.
+        :param point2: The other end of the capsule's segment.
+        :param radius: The radius of the capsule.
+        """
+        point1 = Vector2.from_type(point1)
+        point2 = Vector2.from_type(point2)
+        self.point1 = Vector2(point1.x, point1.y)
+        self.point2 = Vector2(point2.x, point2.y)
+        self.radius = radius
+        self._bounds = None
+        self._core = None
+        # Incremented every time the geometry changes.
+        self.version = 0
+
+    def __repr__(self):
+        return "Capsule(Point1: " + str(self.point1) + " Point2: " + str(self.point2) + \
+               " Radius: " + str(self.radius) + ")"
+
+    def set_points(self, point1, point2):
+        """
+        Moves the ends of the capsule's segment.
+        """
+        point1 = Vector2.from_type(point1)
+        point2 = Vector2.from_type(point2)
+        self.point1 = Vector2(point1.x, point1.y)
+        self.point2 = Vector2(point2.x, point2.y)
+        self._bounds = None
+        self._core = None
+        self.version += 1
+
+    def translate(self, dx, dy):
+        """
+        Moves the capsule by the provided offset.
+        """
+        self.point1.x += dx
+        self.point1.y += dy
+        self.point2.x += dx
+        self.point2.y += dy
+        if self._bounds is not None:
+            self._bounds.x += dx
+            self._bounds.y += dy
+        if self._core is not None:
+            self._core.translate(dx, dy)
+        self.version += 1
+
+    def get_bounds(self):
+        """
+        :return: The axis-aligned bounding box of the capsule. Cached and should not be modified.
+        """
+        if self._bounds is None:
+            radius = self.radius
+            x = min(self.point1.x, self.point2.x) - radius
+            y = min(self.point1.y, self.point2.y) - radius
+            self._bounds = BoundingBox(x, y, abs(self.point1.x - self.point2.x) + radius * 2,
+                                       abs(self.point1.y - self.point2.y) + radius * 2)
+        return self._bounds
+
+    def get_core(self):
+        """
+        :return: The capsule's segment as a ConvexShape with two vertices.
+        """
+        if self._core is None:
+            self._core = ConvexShape([self.point1, self.point2])
+        return self._core
+
+    def project(self, axis):
+        """
+        :param axis: The unit Axis to project the capsule onto.
+        :return: A ShapeProjection.
+        """
+        p1 = self.point1.x * axis.x + self.point1.y * axis.y
+        p2 = self.point2.x * axis.x + self.point2.y * axis.y
+        if p1 > p2:
+            p1, p2 = p2, p1
+        return ShapeProjection(p1 - self.radius, p2 + self.radius)
+
+    def support(self, direction):
+        """
+        :return: The point of the capsule furthest along the direction, as a Vector2.
+        """
+        if direction.dot(self.point1) >= direction.dot(self.point2):
+            point = self.point1
+        else:
+            point = self.point2
+        length = direction.magnitude()
+        if length == 0:
+            return Vector2(point.x, point.y)
+        scale = self.radius / length
+        return Vector2(point.x + direction.x * scale, point.y + direction.y * scale)
+
+    def raycast(self, origin, direction, max_distance=None):
+        """
+        Casts a ray against the capsule, which is the rectangle around its segment and a circle at either end.
+        :param origin: The start of the ray.
+        :param direction: The direction of the ray. Does not have to be a unit vector.
+        :param max_distance: Optional. How far the ray reaches. Defaults to no limit.
+        :return: A RaycastResult, or None when the ray misses. A ray that starts inside of the capsule
+        hits it at a distance of 0.
+        """
+        ox, oy, dx, dy, max_distance = _ray_arguments(origin, direction, max_distance)
+        x1 = self.point1.x
+        y1 = self.point1.y
+        x2 = self.point2.x
+        y2 = self.point2.y
+        radius = self.radius
+        closest = None
+        for hit in (_ray_circle(x1, y1, radius, ox, oy, dx, dy, max_distance),
+                    _ray_circle(x2, y2, radius, ox, oy, dx, dy, max_distance)):
+            if hit is not None and (closest is None or hit[0] < closest[0]):
+                closest = hit
+        length = sqrt((x2 - x1) * (x2 - x1) + (y2 - y1) * (y2 - y1))
+        if length > 0:
+            px = (y1 - y2) / length * radius
+            py = (x2 - x1) / length * radius
+            hit = _ray_polygon([x1 + px, x2 + px, x2 - px, x1 - px], [y1 + py, y2 + py, y2 - py, y1 - py], 0, 4,
+                               ox, oy, dx, dy, max_distance)
+            if hit is not None and (closest is None or hit[0] < closest[0]):
+                closest = hit
+        return _ray_result(closest, ox, oy, dx, dy)
+
+
+class CompoundShape:
+    """
+    A simple polygon that does not have to be convex. It is split into convex pieces once,
+    by ear clipping it into triangles and merging them back together with the Hertel-Mehlhorn
+    algorithm, and tests only run on the pairs of pieces whose bounding boxes intersect.
+    """
+
+    def __init__(self, vertices):
+        """
+        :param vertices: The vertices of the polygon in either winding order. Its edges must not cross.
+        """
+        self._pieces = None
+        self._bounds = None
+        # Incremented every time the geometry changes.
+        self.version = 0
+        self.set_vertices(vertices)
+
+    def __repr__(self):
+        return "CompoundShape(" + str(list(self)) + ")"
+
+    def __len__(self):
+        return len(self._xs)
+
+    def __iter__(self):
+        xs = self._xs
+        ys = self._ys
+        for i in range(len(xs)):
+            yield Vector2(xs[i], ys[i])
+
+    def set_vertices(self, vertices):
+        """
+        Replaces the vertices of the polygon. It is split into pieces again the next time they are needed.
+        """
+        self._xs, self._ys = _vertex_arrays(vertices)
+        self._pieces = None
+        self._bounds = None
+        self.version += 1
+
+    def translate(self, dx, dy):
+        """
+        Moves the polygon and its pieces by the provided offset without splitting it again.
+        """
+        xs = self._xs
+        ys = self._ys
+        for i in range(len(xs)):
+            xs[i] += dx
+            ys[i] += dy
+        if self._pieces is not None:
+            for piece in self._pieces:
+                piece.translate(dx, dy)
+        if self._bounds is not None:
+            self._bounds.x += dx
+            self._bounds.y += dy
+        self.version += 1
+
+    def get_bounds(self):
+        """
+        :return: The axis-aligned bounding box of the polygon. Cached and should not be modified.
+        """
+        if self._bounds is None:
+            if len(self._xs) == 0:
+                self._bounds = BoundingBox(0, 0, 0, 0)
+            else:
+                min_x = min(self._xs)
+                min_y = min(self._ys)
+                self._bounds = BoundingBox(min_x, min_y, max(self._xs) - min_x, max(self._ys) - min_y)
+        return self._bounds
+
+    def get_pieces(self):
+        """
+        :return: The convex pieces of the polygon as a list of ConvexShape's. Cached and should not be modified.
+        """
+        if self._pieces is None:
+            xs = self._xs
+            ys = self._ys
+            self._pieces = [ConvexShape([(xs[i], ys[i]) for i in piece]) for piece in _decompose(xs, ys)]
+        return self._pieces
+
+    def project(self, axis):
+        """
+        Makes a Projection of the polygon onto the provided axis by visiting every vertex,
+        as the polygon may be concave.
+        :param axis: The Axis to project the polygon onto.
+        :return: A ShapeProjection.
+        """
+        xs = self._xs
+        ys = self._ys
+        if len(xs) == 0:
+            return ShapeProjection(0, 0)
+        axisX = axis.x
+        axisY = axis.y
+        minimum = maximum = axisX * xs[0] + axisY * ys[0]
+        for i in range(1, len(xs)):
+            p = axisX * xs[i] + axisY * ys[i]
+            if p < minimum:
+                minimum = p
+            elif p > maximum:
+                maximum = p
+        return ShapeProjection(minimum, maximum)
+
+    def raycast(self, origin, direction, max_distance=None):
+        """
+        Casts a ray against every convex piece of the polygon whose bounding box it crosses.
+        :param origin: The start of the ray.
+        :param direction: The direction of the ray. Does not have to be a unit vector.
+        :param max_distance: Optional. How far the ray reaches. Defaults to no limit.
+        :return: A RaycastResult for the closest hit, or None when the ray misses.
+        """
+        ox, oy, dx, dy, max_distance = _ray_arguments(origin, direction, max_distance)
+        closest = None
+        for piece in self.get_pieces():
+            if _ray_box(piece.get_bounds(), ox, oy, dx, dy, max_distance) is None:
+                continue
+            hit = _ray_polygon(piece._xs, piece._ys, piece._start, piece._count, ox, oy, dx, dy, max_distance)
+            if hit is not None:
+                closest = hit
+                max_distance = hit[0]
+        return _ray_result(closest, ox, oy, dx, dy)
+
+
+def _decompose(xs, ys):
+    """
+    Splits a simple polygon into convex pieces.
+    :return: A list of pieces, each a list of vertex indices in counterclockwise order.
+    """
+    count = len(xs)
+    if count < 3:
+        return [list(range(count))] if count else []
+
+    def cross(o, a, b):
+        return (xs[a] - xs[o]) * (ys[b] - ys[o]) - (ys[a] - ys[o]) * (xs[b] - xs[o])
+
+    area = 0.0
+    for i in range(count):
+        j = i + 1 if i + 1 < count else 0
+        area += xs[i] * ys[j] - xs[j] * ys[i]
+    ring = list(range(count)) if area >= 0 else list(range(count - 1, -1, -1))
+
+    # Ear clipping, remembering the diagonal each ear is cut off along.
+    triangles = []
+    diagonals = []
+    while len(ring) > 3:
+        size = len(ring)
+        ear = -1
+        for k in range(size):
+            a = ring[k - 1]
+            b = ring[k]
+            c = ring[(k + 1) % size]
+            turn = cross(a, b, c)
+            if turn < 0:
+                continue
+            if turn == 0:
+                # A vertex on a straight line adds nothing, so it is dropped without a triangle.
+                ear = k
+                break
+            inside = False
+            for other in ring:
+                if other == a or other == b or other == c:
+                    continue
+                if cross(a, b, other) >= 0 and cross(b, c, other) >= 0 and cross(c, a, other) >= 0:
+                    inside = True
+                    break
+            if not inside:
+                ear = k
+                break
+
+        if ear == -1:
+            # Only happens for polygons that are not simple or lost precision. Clipping the most convex vertex.
+            ear = max(range(size), key=lambda k: cross(ring[k - 1], ring[k], ring[(k + 1) % size]))
+
+        a = ring[ear - 1]
+        b = ring[ear]
+        c = ring[(ear + 1) % size]
+        if cross(a, b, c) > 0:
+            triangles.append([a, b, c])
+            diagonals.append((c, a))
+        del ring[ear]
+    triangles.append(ring)
+
+    # Hertel-Mehlhorn: removing every diagonal whose removal keeps both of its ends convex.
+    pieces = dict(enumerate(triangles))
+    owners = {}
+    for index, piece in pieces.items():
+        for i in range(len(piece)):
+            owners[(piece[i], piece[(i + 1) % len(piece)])] = index
+
+    for a, b in diagonals:
+        first = owners.get((a, b))
+        second = owners.get((b, a))
+        if first is None or second is None or first == second:
+            continue
+        piece1 = pieces[first]
+        piece2 = pieces[second]
+        start1 = piece1.index(b)
+        start2 = piece2.index(a)
+        # piece1 runs b ... a and piece2 runs a ... b, so joining them drops the diagonal.
+        merged = piece1[start1:] + piece1[:start1] + (piece2[start2:] + piece2[:start2])[1:-1]
+        size = len(merged)
+        at_a = merged.index(a)
+        if cross(merged[at_a - 1], a, merged[(at_a + 1) % size]) < 0 or \
+                cross(merged[size - 1], b, merged[1]) < 0:
+            continue
+        pieces[first] = merged
+        del pieces[second]
+        for i in range(size):
+            owners[(merged[i], merged[(i + 1) % size])] = first
+
+    return list(pieces.values())
+
+
+class PolygonStore:
+    """
+    Keeps the vertices of many ConvexShape's in two contiguous arrays of float64 x and y
+    coordinates. The shapes made by add are views into those arrays, so they need 16 bytes
+    per vertex and can be handed to NumPy without copying through as_numpy.
+    """
+
+    def __init__(self):
+        self.xs = array('d')
+        self.ys = array('d')
+        self._shapes = []
+
+    def __len__(self):
+        return len(self._shapes)
+
+    def __getitem__(self, index):
+        return self._shapes[index]
+
+    def __iter__(self):
+        return iter(self._shapes)
+
+    def add(self, vertices):
+        """
+        Appends a polygon to the store.
+        :param vertices: The vertices of the convex polygon.
+        :return: A ConvexShape viewing the polygon's vertices in the store.
+        """
+        shape = ConvexShape.__new__(ConvexShape)
+        shape._xs = self.xs
+        shape._ys = self.ys
+        shape._start = len(self.xs)
+        shape._count = 0
+        shape._store = self
+        shape._clear_cache()
+        shape.version = 0
+        shape.set_vertices(vertices)
+        self._shapes.append(shape)
+        return shape
+
+    def _write(self, shape, xs, ys):
+        """
+        Writes new vertices for one of the store's shapes, in place when the count is unchanged
+        and at the end of the arrays otherwise. The old vertices are left unused in that case.
+        """
+        if len(xs) == shape._count:
+            start = shape._start
+            self.xs[start:start + len(xs)] = xs
+            self.ys[start:start + len(ys)] = ys
+        else:
+            shape._start = len(self.xs)
+            shape._count = len(xs)
+            self.xs.extend(xs)
+            self.ys.extend(ys)
+
+    def as_numpy(self):
+        """
+        Requires NumPy. The x and y arrays share memory with the store, so no vertices are
+        copied. The store cannot grow while they are alive.
+        :return: A tuple of the x and y float64 arrays and the start index and vertex count of every shape.
+        """
+        if np is None:
+            raise ImportError("PolygonStore.as_numpy requires NumPy to be installed.")
+        starts = np.fromiter((shape._start for shape in self._shapes), dtype=np.intp, count=len(self._shapes))
+        counts = np.fromiter((shape._count for shape in self._shapes), dtype=np.intp, count=len(self._shapes))
+        return np.frombuffer(self.xs, dtype=np.float64), np.frombuffer(self.ys, dtype=np.float64), starts, counts
+
+
+class ParallelCollisionRunner:
+    """
+    Runs the full test on a large batch of polygon pairs across a pool of processes, so the work is not
+    bound to a single core by the GIL. The vertices, the pairs and the results all live in one block of
+    shared memory which every worker attaches to once, and each worker is only sent the range of pairs
+    it has to test. No shapes or Vector2's are pickled. Starting the pool has a fixed cost, so it only pays
+    off for batches of many thousands of pairs.
+    Requires Python 3.8 or newer for multiprocessing.shared_memory. The rest of the module does not.
+    """
+
+    def __init__(self, processes=None, chunk_size=None):
+        """
+        :param processes: The number of worker processes. Defaults to the number of cores.
+        With 1, the pairs are tested in this process without a pool.
+        :param chunk_size: Optional. How many pairs are sent to a worker at a time.
+        Defaults to splitting the pairs into 4 chunks per worker.
+        """
+        if processes is not None and processes < 1:
+            raise ValueError("processes must be at least 1. Got: " + str(processes))
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1. Got: " + str(chunk_size))
+        self.processes = processes
+        self.chunk_size = chunk_size
+
+    def run(self, polygons, pairs):
+        """
+        Tests every pair of polygons with IntersectTester.test.
+        :param polygons: A PolygonStore, or a sequence of polygons.
+        :param pairs: A sequence of (index1, index2) tuples of the polygons to test against each other.
+        :return: A tuple of three arrays from the array module, with one item per pair: whether the pair
+        is intersecting as 0 or 1, and the x and the y of its MTV.
+        """
+        if isinstance(polygons, PolygonStore):
+            shapes = polygons
+        else:
+            shapes = [_polygon_only(polygon) for polygon in polygons]
+        pair_indices = array('q')
+        for index1, index2 in pairs:
+            pair_indices.append(index1)
+            pair_indices.append(index2)
+        pair_count = len(pair_indices) // 2
+        if pair_count == 0:
+            return array('b'), array('d'), array('d')
+        if min(pair_indices) < 0 or max(pair_indices) >= len(shapes):
+            raise IndexError("Pair index out of range for " + str(len(shapes)) + " polygons.")
+
+        starts = array('q')
+        counts = array('q')
+        if isinstance(shapes, PolygonStore):
+            xs = shapes.xs
+            ys = shapes.ys
+            for shape in shapes:
+                starts.append(shape._start)
+                counts.append(shape._count)
+        else:
+            xs = array('d')
+            ys = array('d')
+            for shape in shapes:
+                starts.append(len(xs))
+                counts.append(shape._count)
+                xs.extend(shape._xs[shape._start:shape._start + shape._count])
+                ys.extend(shape._ys[shape._start:shape._start + shape._count])
+
+        from multiprocessing import shared_memory
+
+        layout, size = _shared_layout(len(xs), len(shapes), pair_count)
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            views = _shared_views(memory.buf, layout)
+            try:
+                views['xs'][:] = xs
+                views['ys'][:] = ys
+                views['starts'][:] = starts
+                views['counts'][:] = counts
+                views['pairs'][:] = pair_indices
+            finally:
+                _release_views(views)
+
+            processes = self.processes
+            if processes == 1:
+                _attach_worker(memory.name, layout)
+                try:
+                    _run_pair_range((0, pair_count))
+                finally:
+                    _detach_worker()
+            else:
+                context = get_context()
+                if processes is None:
+                    processes = context.cpu_count()
+                chunk_size = self.chunk_size
+                if chunk_size is None:
+                    chunk_size = max(1, -(-pair_count // (processes * 4)))
+                ranges = [(start, min(start + chunk_size, pair_count)) for start in range(0, pair_count, chunk_size)]
+                with context.Pool(processes, initializer=_init_worker, initargs=(memory.name, layout)) as pool:
+                    pool.map(_run_pair_range, ranges)
+
+            views = _shared_views(memory.buf, layout)
+            try:
+                results = array('b', views['hits']), array('d', views['mtv_x']), array('d', views['mtv_y'])
+            finally:
+                _release_views(views)
+        finally:
+            memory.close()
+            memory.unlink()
+        return results
+
+
+def _shared_layout(vertex_count, shape_count, pair_count):
+    """
+    :return: A dict of the byte offset, item count and type code of every array in the shared memory
+    block of a ParallelCollisionRunner, and the size of the whole block. The float arrays come first
+    so every array is aligned to its item size.
+    """
+    layout = {}
+    offset = 0
+    for name, count, typecode in (('xs', vertex_count, 'd'), ('ys', vertex_count, 'd'),
+                                  ('mtv_x', pair_count, 'd'), ('mtv_y', pair_count, 'd'),
+                                  ('starts', shape_count, 'q'), ('counts', shape_count, 'q'),
+                                  ('pairs', pair_count * 2, 'q'), ('hits', pair_count, 'b')):
+        layout[name] = (offset, count, typecode)
+        offset += count * array(typecode).itemsize
+    return layout, max(offset, 1)
+
+
+def _shared_views(buffer, layout):
+    """
+    :return: A dict of typed memoryviews over every array of a shared memory block.
+    """
+    views = {}
+    for name, (offset, count, typecode) in layout.items():
+        views[name] = buffer[offset:offset + count * array(typecode).itemsize].cast(typecode)
+    return views
+
+
+def _release_views(views):
+    # The shared memory can only be closed once nothing is viewing it anymore.
+    for view in views.values():
+        view.release()
+
+
+# The shared memory, its views and the shapes viewing it, in a worker of a ParallelCollisionRunner.
+_worker_state = None
+
+
+def _attach_worker(name, layout):
+    """
+    Attaches a worker to the shared memory block and makes a ConvexShape view of every polygon in it.
+    """
+    from multiprocessing import shared_memory
+
+    global _worker_state
+    memory = shared_memory.SharedMemory(name=name)
+    views = _shared_views(memory.buf, layout)
+    xs = views['xs']
+    ys = views['ys']
+    shapes = []
+    for start, count in zip(views['starts'], views['counts']):
+        shape = ConvexShape.__new__(ConvexShape)
+        shape._xs = xs
+        shape._ys = ys
+        shape._start = start
+        shape._count = count
+        shape._store = None
+        shape._clear_cache()
+        shape.version = 0
+        shapes.append(shape)
+    _worker_state = memory, views, shapes
+
+
+def _init_worker(name, layout):
+    """
+    The initializer of the pool workers of a ParallelCollisionRunner.
+    """
+    _attach_worker(name, layout)
+    # Pool workers do not run the code after their last task, so detaching happens as they exit.
+    Finalize(None, _detach_worker, exitpriority=10)
+
+
+def _detach_worker():
+    global _worker_state
+    if _worker_state is None:
+        return
+    memory, views, shapes = _worker_state
+    _worker_state = None
+    del shapes[:]
+    _release_views(views)
+    memory.close()
+
+
+def _run_pair_range(pair_range):
+    """
+    Tests a range of the pairs in the shared memory block of the worker and writes their results back into it.
+    """
+    memory, views, shapes = _worker_state
+    pairs = views['pairs']
+    hits = views['hits']
+    mtv_x = views['mtv_x']
+    mtv_y = views['mtv_y']
+    for i in range(pair_range[0], pair_range[1]):
+        result = IntersectTester(shapes[pairs[2 * i]], shapes[pairs[2 * i + 1]]).test()
+        hits[i] = 1 if result.intersecting else 0
+        mtv_x[i] = result.mtv.x
+        mtv_y[i] = result.mtv.y
+
+
+class ThreadedBatchRunner:
+    """
+    Runs NumPy SAT batches on a pool of threads, so that callers such as several game rooms running in
+    their own threads can hand off their collision passes and have them overlap. NumPy releases the GIL
+    while it works on arrays, so batches run at the same time on several cores, especially batches from
+    sat_batch_indexed, where no per-pair Python work is left. Requires NumPy.
+    """
+
+    def __init__(self, max_workers=None):
+        """
+        :param max_workers: The number of threads. Defaults to the concurrent.futures default.
+        """
+        if np is None:
+            raise ImportError("ThreadedBatchRunner requires NumPy to be installed.")
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def submit(self, pairs):
+        """
+        Queues a batch of pairs to be tested with IntersectTester.test_many.
+        :param pairs: A sequence of (pol1, pol2) tuples.
+        :return: A Future of the arrays returned by sat_batch.
+        """
+        return self._executor.submit(IntersectTester.test_many, pairs)
+
+    def submit_indexed(self, store, indices_a, indices_b):
+        """
+        Queues a batch of pairs of polygons from a PolygonStore to be tested with sat_batch_indexed.
+        :return: A Future of the arrays returned by sat_batch_indexed.
+        """
+        return self._executor.submit(sat_batch_indexed, store, indices_a, indices_b)
+
+    def run(self, shards):
+        """
+        Tests every shard of pairs as its own batch and waits for all of them.
+        :param shards: A dict mapping a key, such as a room or a region, to a sequence of (pol1, pol2) tuples.
+        :return: A dict mapping every key to the arrays returned by sat_batch for its pairs.
+        """
+        futures = {key: self.submit(pairs) for key, pairs in shards.items()}
+        return {key: future.result() for key, future in futures.items()}
+
+    @staticmethod
+    def shard_by_region(pairs, region_size):
+        """
+        Splits pairs into square regions by the center of the bounding box of their first polygon.
+        :param pairs: A sequence of (pol1, pol2) tuples.
+        :param region_size: The width and height of each region.
+        :return: A dict mapping the (x, y) cell of every region to the list of its pairs, ready for run.
+        """
+        if region_size <= 0:
+            raise ValueError("region_size must be positive. Got: " + str(region_size))
+        shards = {}
+        for pair in pairs:
+            center = to_polygon(pair[0]).get_bounds().get_center()
+            region = (floor(center.x / region_size), floor(center.y / region_size))
+            shard = shards.get(region)
+            if shard is None:
+                shards[region] = shard = []
+            shard.append(pair)
+        return shards
+
+    def shutdown(self, wait=True):
+        """
+        Stops the threads once the queued batches are done.
+        :param wait: If true, blocks until they are.
+        """
+        self._executor.shutdown(wait)
+
+
+class SpatialHashGrid:
+    """
+    A broad phase that buckets BoundingBox's into a uniform grid of square cells.
+    Keys are only compared against keys that share at least one cell with them,
+    which avoids testing every pair of shapes against each other.
+    """
+
+    def __init__(self, cell_size=64):
+        """
+        :param cell_size: The width and height of each grid cell. Should be around the size of a typical shape.
+        """
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive. Got: " + str(cell_size))
+        self.cell_size = cell_size
+        self._cells = {}
+        self._ranges = {}
+        self._bounds = {}
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def __contains__(self, key):
+        return key in self._bounds
+
+    def _cell_range(self, bounds):
+        size = self.cell_size
+        return (floor(bounds.x / size), floor(bounds.y / size),
+                floor((bounds.x + bounds.width) / size), floor((bounds.y + bounds.height) / size))
+
+    def _add_to_cells(self, key, cell_range, skip=None):
+        cells = self._cells
+        for cx in range(cell_range[0], cell_range[2] + 1):
+            for cy in range(cell_range[1], cell_range[3] + 1):
+                if skip is not None and skip[0] <= cx <= skip[2] and skip[1] <= cy <= skip[3]:
+                    continue
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    cells[(cx, cy)] = cell = set()
+                cell.add(key)
+
+    def _remove_from_cells(self, key, cell_range, skip=None):
+        cells = self._cells
+        for cx in range(cell_range[0], cell_range[2] + 1):
+            for cy in range(cell_range[1], cell_range[3] + 1):
+                if skip is not None and skip[0] <= cx <= skip[2] and skip[1] <= cy <= skip[3]:
+                    continue
+                cell = cells[(cx, cy)]
+                cell.discard(key)
+                if not cell:
+                    del cells[(cx, cy)]
+
+    def insert(self, key, bounds):
+        """
+        Adds a key to the grid.
+        :param key: Any hashable value identifying the shape.
+        :param bounds: The BoundingBox of the shape.
+        """
+        if key in self._bounds:
+            raise KeyError("Key is already in the grid: " + repr(key))
+        cell_range = self._cell_range(bounds)
+        self._bounds[key] = bounds
+        self._ranges[key] = cell_range
+        self._add_to_cells(key, cell_range)
+
+    def remove(self, key):
+        """
+        Removes a key from the grid.
+        :param key: The key to remove.
+        """
+        self._remove_from_cells(key, self._ranges.pop(key))
+        del self._bounds[key]
+
+    def update(self, key, bounds):
+        """
+        Moves a key to its new bounds. Only the cells the key enters or leaves are touched.
+        :param key: The key to move.
+        :param bounds: The new BoundingBox of the shape.
+        """
+        old_range = self._ranges[key]
+        new_range = self._cell_range(bounds)
+        self._bounds[key] = bounds
+        if new_range != old_range:
+            self._remove_from_cells(key, old_range, skip=new_range)
+            self._add_to_cells(key, new_range, skip=old_range)
+            self._ranges[key] = new_range
+
+    def query(self, bounds):
+        """
+        :param bounds: The BoundingBox to search.
+        :return: A set of the keys whose bounds intersect with the provided bounds.
+        """
+        found = set()
+        cells = self._cells
+        all_bounds = self._bounds
+        min_cx, min_cy, max_cx, max_cy = self._cell_range(bounds)
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    continue
+                for key in cell:
+                    if key not in found and all_bounds[key].intersects_with(bounds):
+                        found.add(key)
+        return found
+
+    def pairs(self):
+        """
+        Yields every pair of keys with intersecting bounds exactly once.
+        A pair is only reported from the first cell both keys share, so no set of seen pairs is needed.
+        """
+        ranges = self._ranges
+        all_bounds = self._bounds
+        for (cx, cy), cell in self._cells.items():
+            if len(cell) < 2:
+                continue
+            keys = list(cell)
+            for i in range(len(keys)):
+                key1 = keys[i]
+                range1 = ranges[key1]
+                bounds1 = all_bounds[key1]
+                for j in range(i + 1, len(keys)):
+                    key2 = keys[j]
+                    range2 = ranges[key2]
+                    if max(range1[0], range2[0]) != cx or max(range1[1], range2[1]) != cy:
+                        continue
+                    if bounds1.intersects_with(all_bounds[key2]):
+                        yield key1, key2
+
+    def raycast(self, ox, oy, dx, dy, max_distance, callback):
+        """
+        Walks the cells along a ray in order, from the nearest to the furthest, and passes every key whose
+        bounds the ray crosses to the callback once. Stops at the first cell beyond the closest hit.
+        :param ox: The x of the origin of the ray.
+        :param oy: The y of the origin of the ray.
+        :param dx: The x of the unit direction of the ray.
+        :param dy: The y of the unit direction of the ray.
+        :param max_distance: How far the ray reaches. May be infinite.
+        :param callback: Called with a key. Returns the distance at which the ray hits the shape of the key,
+        or None on a miss.
+        """
+        cells = self._cells
+        if not cells:
+            return
+        size = self.cell_size
+        # Only walking through the part of the ray that crosses occupied cells, as a long ray that misses
+        # would otherwise visit every empty cell up to its maximum distance.
+        min_cx = min(cell[0] for cell in cells)
+        min_cy = min(cell[1] for cell in cells)
+        max_cx = max(cell[0] for cell in cells) + 1
+        max_cy = max(cell[1] for cell in cells) + 1
+        region = BoundingBox(min_cx * size, min_cy * size, (max_cx - min_cx) * size, (max_cy - min_cy) * size)
+        start = _ray_box(region, ox, oy, dx, dy, max_distance)
+        if start is None:
+            return
+        end = min(max_distance,
+                  max(abs(x * size - ox) + abs(y * size - oy) for x in (min_cx, max_cx) for y in (min_cy, max_cy)))
+
+        x = ox + dx * start
+        y = oy + dy * start
+        cx = floor(x / size)
+        cy = floor(y / size)
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        next_x = start + ((cx + (dx > 0)) * size - x) / dx if dx != 0 else float('inf')
+        next_y = start + ((cy + (dy > 0)) * size - y) / dy if dy != 0 else float('inf')
+        delta_x = size / abs(dx) if dx != 0 else float('inf')
+        delta_y = size / abs(dy) if dy != 0 else float('inf')
+
+        all_bounds = self._bounds
+        seen = set()
+        cell_distance = start
+        while cell_distance <= max_distance and cell_distance <= end:
+            cell = cells.get((cx, cy))
+            if cell is not None:
+                for key in cell:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    if _ray_box(all_bounds[key], ox, oy, dx, dy, max_distance) is not None:
+                        distance = callback(key)
+                        if distance is not None and distance < max_distance:
+                            max_distance = distance
+            if next_x < next_y:
+                cell_distance = next_x
+                next_x += delta_x
+                cx += step_x
+            else:
+                cell_distance = next_y
+                next_y += delta_y
+                cy += step_y
+
+
+class SweepAndPrune:
+    """
+    A broad phase that keeps the ends of every BoundingBox sorted along one axis.
+    Moving keys only nudge their ends in the sorted list, so the list is re-sorted
+    with an insertion sort which is close to linear when shapes move a little each frame.
+    Works best when shapes are spread out along the chosen axis, such as in long corridors.
+    """
+
+    def __init__(self, axis='x'):
+        """
+        :param axis: The axis to sort along. Either 'x' or 'y'.
+        """
+        if axis not in ('x', 'y'):
+            raise ValueError("axis must be 'x' or 'y'. Got: " + repr(axis))
+        self.axis = axis
+        self._endpoints = []
+        self._key_endpoints = {}
+        self._bounds = {}
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def __contains__(self, key):
+        return key in self._bounds
+
+    def _extent(self, bounds):
+        if self.axis == 'x':
+            return bounds.x, bounds.x + bounds.width
+        return bounds.y, bounds.y + bounds.height
+
+    def insert(self, key, bounds):
+        """
+        Adds a key to the broad phase.
+        :param key: Any hashable value identifying the shape.
+        :param bounds: The BoundingBox of the shape.
+        """
+        if key in self._bounds:
+            raise KeyError("Key is already in the broad phase: " + repr(key))
+        low, high = self._extent(bounds)
+        endpoints = (_Endpoint(low, True, key), _Endpoint(high, False, key))
+        self._bounds[key] = bounds
+        self._key_endpoints[key] = endpoints
+        self._endpoints.extend(endpoints)
+
+    def remove(self, key):
+        """
+        Removes a key from the broad phase.
+        :param key: The key to remove.
+        """
+        del self._bounds[key]
+        del self._key_endpoints[key]
+        self._endpoints = [endpoint for endpoint in self._endpoints if endpoint.key != key]
+
+    def update(self, key, bounds):
+        """
+        Moves a key to its new bounds. The endpoint list is re-sorted on the next query.
+        :param key: The key to move.
+        :param bounds: The new BoundingBox of the shape.
+        """
+        low_endpoint, high_endpoint = self._key_endpoints[key]
+        low_endpoint.value, high_endpoint.value = self._extent(bounds)
+        self._bounds[key] = bounds
+
+    def _sort(self):
+        """
+        Insertion sorts the endpoints. Ends with equal values have maximums before minimums
+        so touching boxes are not reported, matching BoundingBox.intersects_with.
+        """
+        endpoints = self._endpoints
+        for i in range(1, len(endpoints)):
+            endpoint = endpoints[i]
+            value = endpoint.value
+            is_min = endpoint.is_min
+            j = i - 1
+            while j >= 0:
+                other = endpoints[j]
+                if other.value < value or (other.value == value and (is_min or not other.is_min)):
+                    break
+                endpoints[j + 1] = other
+                j -= 1
+            endpoints[j + 1] = endpoint
+
+    def query(self, bounds):
+        """
+        :param bounds: The BoundingBox to search.
+        :return: A set of the keys whose bounds intersect with the provided bounds.
+        """
+        self._sort()
+        found = set()
+        all_bounds = self._bounds
+        high = self._extent(bounds)[1]
+        for endpoint in self._endpoints:
+            if endpoint.value >= high:
+                break
+            if endpoint.is_min and all_bounds[endpoint.key].intersects_with(bounds):
+                found.add(endpoint.key)
+        return found
+
+    def pairs(self):
+        """
+        Yields every pair of keys with intersecting bounds exactly once by sweeping
+        along the sorted endpoints and only comparing keys that are open at the same time.
+        """
+        self._sort()
+        all_bounds = self._bounds
+        active = {}
+        for endpoint in self._endpoints:
+            key = endpoint.key
+            if endpoint.is_min:
+                bounds = all_bounds[key]
+                for other in active:
+                    if bounds.intersects_with(all_bounds[other]):
+                        yield other, key
+                active[key] = True
+            else:
+                del active[key]
+
+    def raycast(self, ox, oy, dx, dy, max_distance, callback):
+        """
+        Finds the keys whose extent along the sorted axis the ray crosses, and passes the ones whose bounds
+        the ray hits to the callback, from the nearest to the furthest, until the closest hit is found.
+        :param ox: The x of the origin of the ray.
+        :param oy: The y of the origin of the ray.
+        :param dx: The x of the unit direction of the ray.
+        :param dy: The y of the unit direction of the ray.
+        :param max_distance: How far the ray reaches. May be infinite.
+        :param callback: Called with a key. Returns the distance at which the ray hits the shape of the key,
+        or None on a miss.
+        """
+        self._sort()
+        if self.axis == 'x':
+            origin, direction = ox, dx
+        else:
+            origin, direction = oy, dy
+        if direction == 0:
+            low = high = origin
+        elif max_distance == float('inf'):
+            low, high = (origin, max_distance) if direction > 0 else (-max_distance, origin)
+        else:
+            low = min(origin, origin + direction * max_distance)
+            high = max(origin, origin + direction * max_distance)
+
+        all_bounds = self._bounds
+        candidates = []
+        for endpoint in self._endpoints:
+            if endpoint.value > high:
+                break
+            if endpoint.is_min and self._key_endpoints[endpoint.key][1].value >= low:
+                distance = _ray_box(all_bounds[endpoint.key], ox, oy, dx, dy, max_distance)
+                if distance is not None:
+                    candidates.append((distance, endpoint.key))
+        candidates.sort(key=lambda candidate: candidate[0])
+
+        for entry, key in candidates:
+            if entry > max_distance:
+                break
+            distance = callback(key)
+            if distance is not None and distance < max_distance:
+                max_distance = distance
+
+
+class _Endpoint:
+    """
+    The minimum or maximum end of a key's bounds along the axis of a SweepAndPrune.
+    """
+
+    def __init__(self, value, is_min, key):
+        self.value = value
+        self.is_min = is_min
+        self.key = key
+
+
+class DynamicAABBTree:
+    """
+    A broad phase that stores BoundingBox's in a balanced binary tree, similar to Box2D's b2DynamicTree.
+    Every key is stored with a fattened bounding box, so a key that moves a little stays inside of it
+    and the tree is not changed. Queries only visit the branches whose bounds overlap, which makes them
+    logarithmic in the number of keys. Works best for many mostly static shapes.
     """
 
-    def __init__(self, pol1, pol2):
+    def __init__(self, margin=2.0):
         """
-        Spawns an instance of an InterestTester provided the actual shapes to test for.
-        Ensure that both the inputted polygons are not the same.
-        Args:
-            pol1: 1 of 2 polygons that a collision will be tested for.
-            pol2: 1 of 2 polygons that a collision will be tested for.
+        :param margin: How far the stored bounding boxes are grown on every side.
         """
-        self.pol1 = pol1
-        self.pol2 = pol2
+        self.margin = margin
+        self._root = None
+        self._leaves = {}
+        self._bounds = {}
+        self._next_order = 0
 
-    def test_minor(self) -> bool:
+    def __len__(self):
+        return len(self._leaves)
+
+    def __contains__(self, key):
+        return key in self._leaves
+
+    def get_height(self):
         """
-        Performs only a check against the polygons bounding boxes. May provide inconsistent
-        information about the intersection as a single axis-aligned bounding box check
-        is not very accurate.
+        :return: The height of the tree. A tree with a single leaf has a height of 0.
         """
+        return -1 if self._root is None else self._root.height
 
-        bounds1 = BoundingBox.generate_bounds_from(self.pol1)
-        bounds2 = BoundingBox.generate_bounds_from(self.pol2)
-        return bounds1.intersects_with(bounds2)
+    def get_fat_bounds(self, key):
+        """
+        :return: The fattened BoundingBox stored in the tree for the provided key.
+        """
+        return self._leaves[key].bounds
 
-    def test_major(self):
+    def insert(self, key, bounds):
         """
-        Performs only the SAT algorithm to determine an intersection result. Can be inefficient when used
-        without the test_minor method as there may not even be an intersection between the two shapes
-        and now you're running through an entire SAT algorithm to check for an intersection. When used with test_minor,
-        it will inform you of the possibility of a current intersection between the two shapes.
-        :return: An IntersectResult containing information on the intersection.
+        Adds a key to the tree.
+        :param key: Any hashable value identifying the shape.
+        :param bounds: The BoundingBox of the shape.
         """
+        if key in self._leaves:
+            raise KeyError("Key is already in the tree: " + repr(key))
+        leaf = _TreeNode(bounds.expanded(self.margin))
+        leaf.key = key
+        leaf.order = self._next_order
+        self._next_order += 1
+        self._leaves[key] = leaf
+        self._bounds[key] = bounds
+        self._insert_leaf(leaf)
 
-        # Control overlap to be changed. Set to high value to find the lowest one.
-        overlap = 999999
-        # A default axis
-        n = Vector2(0, 0)
+    def remove(self, key):
+        """
+        Removes a key from the tree.
+        :param key: The key to remove.
+        """
+        leaf = self._leaves.pop(key)
+        del self._bounds[key]
+        self._remove_leaf(leaf)
 
-        # Looping through axes's...
-        for normal in IntersectTester._get_normals_from(self.pol1) + IntersectTester._get_normals_from(self.pol2):
-            if normal.isZero():
+    def update(self, key, bounds):
+        """
+        Moves a key to its new bounds. The tree is only changed when the new bounds
+        leave the fattened bounds stored for the key.
+        :param key: The key to move.
+        :param bounds: The new BoundingBox of the shape.
+        :return: True if the key had to be re-inserted into the tree.
+        """
+        leaf = self._leaves[key]
+        self._bounds[key] = bounds
+        if leaf.bounds.contains(bounds):
+            return False
+        self._remove_leaf(leaf)
+        leaf.bounds = bounds.expanded(self.margin)
+        self._insert_leaf(leaf)
+        return True
+
+    def query(self, bounds):
+        """
+        :param bounds: The BoundingBox to search.
+        :return: A set of the keys whose bounds intersect with the provided bounds.
+        """
+        found = set()
+        if self._root is None:
+            return found
+        all_bounds = self._bounds
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if not node.bounds.intersects_with(bounds):
                 continue
+            if node.child1 is None:
+                if all_bounds[node.key].intersects_with(bounds):
+                    found.add(node.key)
+            else:
+                stack.append(node.child1)
+                stack.append(node.child2)
+        return found
 
-            p1 = IntersectTester.projection_of_onto(self.pol1, normal)
-            p2 = IntersectTester.projection_of_onto(self.pol2, normal)
+    def query_point(self, x, y):
+        """
+        :return: A set of the keys whose bounds contain the point (x, y).
+        """
+        found = set()
+        if self._root is None:
+            return found
+        all_bounds = self._bounds
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if not node.bounds.contains_point(x, y):
+                continue
+            if node.child1 is None:
+                if all_bounds[node.key].contains_point(x, y):
+                    found.add(node.key)
+            else:
+                stack.append(node.child1)
+                stack.append(node.child2)
+        return found
 
-            # Checking for axes overlap...
-            if p1.overlaps(p2):
-                o = p1.get_overlap(p2)
-
-                # Checking for containment...
-                if p1.contains(p2) or p2.contains(p1):
-                    possibleMin = abs(p1.minimum - p2.minimum)
-                    possibleMax = abs(p1.maximum - p2.maximum)
-
-                    if possibleMin < possibleMax:
-                        o += possibleMin
-                    else:
-                        o += possibleMax
-                        
-                if o < overlap:
-                    overlap = o
-                    n = normal
+    def pairs(self):
+        """
+        Yields every pair of keys with intersecting bounds exactly once. Each leaf queries the
+        tree with its own bounds and only reports the leaves inserted after it.
+        """
+        if self._root is None:
+            return
+        all_bounds = self._bounds
+        for key, leaf in self._leaves.items():
+            bounds = all_bounds[key]
+            stack = [self._root]
+            while stack:
+                node = stack.pop()
+                if not node.bounds.intersects_with(bounds):
+                    continue
+                if node.child1 is None:
+                    if node.order > leaf.order and all_bounds[node.key].intersects_with(bounds):
+                        yield key, node.key
+                else:
+                    stack.append(node.child1)
+                    stack.append(node.child2)
 
+    def raycast(self, ox, oy, dx, dy, max_distance, callback):
+        """
+        Walks down the branches of the tree whose bounds the ray crosses, nearest branch first, and passes
+        the keys of the leaves it reaches to the callback. Branches beyond the closest hit are skipped.
+        :param ox: The x of the origin of the ray.
+        :param oy: The y of the origin of the ray.
+        :param dx: The x of the unit direction of the ray.
+        :param dy: The y of the unit direction of the ray.
+        :param max_distance: How far the ray reaches. May be infinite.
+        :param callback: Called with a key. Returns the distance at which the ray hits the shape of the key,
+        or None on a miss.
+        """
+        if self._root is None:
+            return
+        entry = _ray_box(self._root.bounds, ox, oy, dx, dy, max_distance)
+        if entry is None:
+            return
+        stack = [(entry, self._root)]
+        while stack:
+            entry, node = stack.pop()
+            if entry > max_distance:
+                continue
+            if node.child1 is None:
+                distance = callback(node.key)
+                if distance is not None and distance < max_distance:
+                    max_distance = distance
+                continue
+            entry1 = _ray_box(node.child1.bounds, ox, oy, dx, dy, max_distance)
+            entry2 = _ray_box(node.child2.bounds, ox, oy, dx, dy, max_distance)
+            # Pushing the nearer child last so it is visited first.
+            if entry1 is not None and entry2 is not None and entry1 < entry2:
+                stack.append((entry2, node.child2))
+                stack.append((entry1, node.child1))
             else:
-                # No Intersection. Quit algorithm right away.
-                return IntersectResult(False, Vector2(0, 0))
+                if entry1 is not None:
+                    stack.append((entry1, node.child1))
+                if entry2 is not None:
+                    stack.append((entry2, node.child2))
 
-        shape1Bounds = BoundingBox.generate_bounds_from(self.pol1)
-        shape2Bounds = BoundingBox.generate_bounds_from(self.pol2)
+    def _insert_leaf(self, leaf):
+        if self._root is None:
+            self._root = leaf
+            leaf.parent = None
+            return
 
-        dot = Vector2.dot(shape2Bounds.get_center() - shape1Bounds.get_center(), n)
+        # Finding the best sibling by walking down the cheapest branch.
+        leaf_bounds = leaf.bounds
+        sibling = self._root
+        while sibling.child1 is not None:
+            area = sibling.bounds.perimeter()
+            combined_area = sibling.bounds.union(leaf_bounds).perimeter()
+            # Cost of making a new parent for the sibling and the leaf.
+            cost = 2 * combined_area
+            # Minimum cost of pushing the leaf further down the tree.
+            inheritance_cost = 2 * (combined_area - area)
 
-        if dot < 0:
-            n = -n
+            cost1 = self._descend_cost(sibling.child1, leaf_bounds) + inheritance_cost
+            cost2 = self._descend_cost(sibling.child2, leaf_bounds) + inheritance_cost
+            if cost < cost1 and cost < cost2:
+                break
+            sibling = sibling.child1 if cost1 < cost2 else sibling.child2
 
-        # If execution gets to this point, the algorithm did not return and thus there is an intersection
-        # between the two shapes.
-        return IntersectResult(True, n * overlap)
+        old_parent = sibling.parent
+        new_parent = _TreeNode(sibling.bounds.union(leaf_bounds))
+        new_parent.parent = old_parent
+        new_parent.height = sibling.height + 1
+        new_parent.child1 = sibling
+        new_parent.child2 = leaf
+        sibling.parent = new_parent
+        leaf.parent = new_parent
+
+        if old_parent is None:
+            self._root = new_parent
+        elif old_parent.child1 is sibling:
+            old_parent.child1 = new_parent
+        else:
+            old_parent.child2 = new_parent
+
+        self._refit(new_parent.parent)
+
+    @staticmethod
+    def _descend_cost(child, leaf_bounds):
+        if child.child1 is None:
+            return child.bounds.union(leaf_bounds).perimeter()
+        return child.bounds.union(leaf_bounds).perimeter() - child.bounds.perimeter()
+
+    def _remove_leaf(self, leaf):
+        if leaf is self._root:
+            self._root = None
+            return
+
+        parent = leaf.parent
+        grand_parent = parent.parent
+        sibling = parent.child2 if parent.child1 is leaf else parent.child1
+        leaf.parent = None
 
-    def test(self):
+        if grand_parent is None:
+            self._root = sibling
+            sibling.parent = None
+            return
+
+        if grand_parent.child1 is parent:
+            grand_parent.child1 = sibling
+        else:
+            grand_parent.child2 = sibling
+        sibling.parent = grand_parent
+        self._refit(grand_parent)
+
+    def _refit(self, node):
         """
-        Performs a full test - that is the preliminary bounding box check for performance and the SAT algorithm.
-        :return: IntersectResult containing information representing whether there is an intersection
-        between the two polygons.
+        Walks from the node up to the root, balancing and refitting the bounds and heights along the way.
         """
-        bounds_is_intersecting = self.test_minor()
-        if bounds_is_intersecting:
-            return self.test_major()
-        return IntersectResult(False, Vector2(0, 0))
+        while node is not None:
+            node = self._balance(node)
+            node.height = 1 + max(node.child1.height, node.child2.height)
+            node.bounds = node.child1.bounds.union(node.child2.bounds)
+            node = node.parent
 
-    @staticmethod
-    def _get_normals_from(polygon):
+    def _balance(self, a):
         """
-        :param polygon: The polygon to get edge normals from.
-        :return: Retrieves the edge normals of the provided convex polygon.
+        Performs a left or right rotation if node a is imbalanced.
+        :return: The node that took the place of node a.
         """
-        normals = []
-        for i in range(len(polygon)):
-            vertexVector1 = Vector2.from_type(polygon[i])
-            if i + 1 >= len(polygon):
-                return normals
+        if a.child1 is None or a.height < 2:
+            return a
+
+        b = a.child1
+        c = a.child2
+        balance = c.height - b.height
+
+        # Rotating c up.
+        if balance > 1:
+            f = c.child1
+            g = c.child2
+            self._swap_with_parent(c, a)
+            if f.height > g.height:
+                c.child2 = f
+                a.child2 = g
+                g.parent = a
             else:
-                vertexVector2 = Vector2.from_type(polygon[i + 1])
-            edge = vertexVector1 - vertexVector2
-            normals.append(edge.get_perpendicular().normalized())
-        return normals
+                c.child2 = g
+                a.child2 = f
+                f.parent = a
+            self._fit(a)
+            self._fit(c)
+            return c
 
-    @staticmethod
-    def projection_of_onto(pol1, axis):
+        # Rotating b up.
+        if balance < -1:
+            d = b.child1
+            e = b.child2
+            self._swap_with_parent(b, a)
+            if d.height > e.height:
+                b.child2 = d
+                a.child1 = e
+                e.parent = a
+            else:
+                b.child2 = e
+                a.child1 = d
+                d.parent = a
+            self._fit(a)
+            self._fit(b)
+            return b
+
+        return a
+
+    def _swap_with_parent(self, child, parent):
         """
-        Makes a Projection of the inputted shape onto the
-        provided axis.
-        :param pol1: The 2D polygon to be projected.
-        :param axis: The Axis to project the polygon onto.
-        :return: A ShapeProjection.
+        Moves the child into the place of its parent, making the parent the child's first child.
         """
-        minimum = 9999999
-        maximum = -9999999
-        for vertex in pol1:
-            vecVertex = Vector2.from_type(vertex)
-            p = Vector2.dot(axis, vecVertex)
-            if p < minimum:
-                minimum = p
-            elif p > maximum:
-                maximum = p
-        return ShapeProjection(minimum, maximum)
+        child.child1 = parent
+        child.parent = parent.parent
+        parent.parent = child
+        if child.parent is None:
+            self._root = child
+        elif child.parent.child1 is parent:
+            child.parent.child1 = child
+        else:
+            child.parent.child2 = child
 
+    @staticmethod
+    def _fit(node):
+        node.bounds = node.child1.bounds.union(node.child2.bounds)
+        node.height = 1 + max(node.child1.height, node.child2.height)
 
-class BoundingBox:
+
+class _TreeNode:
     """
-    Represents an axis-aligned BoundingBox - AABB.
-    Consists of an x and a y coordinate representing the top
-    left corner of the box, and a width and height
-    value for the width and height of the bounding box.
+    A node of a DynamicAABBTree. Leaves have no children and carry the key of a shape.
     """
 
-    def __init__(self, x, y, width, height):
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.parent = None
+        self.child1 = None
+        self.child2 = None
+        self.height = 0
+        self.key = None
+        self.order = 0
+
+
+class CollisionWorld:
+    """
+    Holds many shapes and finds every intersecting pair between them. A broad phase
+    first finds the pairs whose bounding boxes intersect, and only those pairs are
+    narrowed down with the SAT algorithm, or with GJK when chosen through the engine.
+    """
+
+    def __init__(self, broad_phase=None, engine='sat'):
         """
-        Creates an instance of BoundingBox.
-        :param x: x coordinate of the top left corner of the bounding box.
-        :param y: y coordinate of the top left corner of the bounding box.
-        :param width: Width of the bounding box.
-        :param height: Height of the bounding box.
+        :param broad_phase: The broad phase used to find candidate pairs, such as a SpatialHashGrid,
+        a SweepAndPrune or a DynamicAABBTree. Defaults to a SpatialHashGrid.
+        :param engine: The narrow phase engine passed to IntersectTester. One of 'sat', 'gjk' or 'auto'.
         """
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
+        self.broad_phase = broad_phase if broad_phase is not None else SpatialHashGrid()
+        self.axis_cache = SeparatingAxisCache()
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine: " + repr(engine) + ". Expected one of: " + ", ".join(ENGINES))
+        self.engine = engine
+        self._shapes = {}
+        self._next_id = 0
 
-    def __repr__(self):
+    def __len__(self):
+        return len(self._shapes)
+
+    def add(self, shape):
         """
-        :rtype: str
+        Adds a shape to the world.
+        :param shape: A ConvexShape or a list of vertices.
+        :return: The id of the shape within this world.
         """
-        return "Bounding Box(X: " + str(self.x) + " Y: " + str(self.y) + " Width: " + str(self.width) + \
-               " Height: " + str(self.height) + ")"
+        shape = to_polygon(shape)
+        shape_id = self._next_id
+        self._next_id += 1
+        self._shapes[shape_id] = shape
+        self.broad_phase.insert(shape_id, shape.get_bounds())
+        return shape_id
 
-    def __eq__(self, other):
-        return self.x == other.x and self.y == other.y and self.height == other.height and self.width == other.width
+    def remove(self, shape_id):
+        """
+        Removes a shape from the world.
+        :param shape_id: The id returned by add.
+        """
+        self.axis_cache.discard(self._shapes.pop(shape_id))
+        self.broad_phase.remove(shape_id)
 
-    def intersects_with(self, other):
+    def get_shape(self, shape_id):
         """
-        Checks for an intersection between itself and the other provided bounding box.
-        :param other: The other bounding box to if intersecting. Will raise a
-        TypeError if 'other' is not a BoundingBox.
-        :return: A boolean - true for an intersection.
-        :rtype:
+        :return: The ConvexShape stored under the provided id.
         """
-        # Type checking to throw an error if the user inputted something other than a BoundingBox
-        # otherwise Python will throw it's own vague error.
-        if not isinstance(other, BoundingBox):
-            raise TypeError("Incorrect type for parameter 'other'. Expected a BoundingBox not: " + type(other).__name__)
+        return self._shapes[shape_id]
 
-        return self.x < other.x + other.width \
-               and self.x + self.width > other.x \
-               and self.y < other.y + other.height \
-               and self.y + self.height > other.y
+    def update(self, shape_id):
+        """
+        Lets the broad phase know that a shape has been changed outside of the world,
+        for example through ConvexShape.set_vertices.
+        :param shape_id: The id of the changed shape.
+        """
+        self.broad_phase.update(shape_id, self._shapes[shape_id].get_bounds())
 
-    def corners(self):
-        return [Vector2(self.x, self.y), Vector2(self.x + self.width, self.y),
-                Vector2(self.x + self.width, self.y + self.height), Vector2(self.x, self.y + self.height),
-                Vector2(self.x, self.y)]
+    def move(self, shape_id, dx, dy):
+        """
+        Translates a shape and updates the broad phase.
+        :param shape_id: The id of the shape to move.
+        :param dx: Offset along the x axis.
+        :param dy: Offset along the y axis.
+        """
+        shape = self._shapes[shape_id]
+        shape.translate(dx, dy)
+        self.broad_phase.update(shape_id, shape.get_bounds())
 
-    def get_center(self):
-        return Vector2(self.x + (self.width / 2), self.y + (self.height / 2))
+    def query(self, bounds):
+        """
+        :param bounds: The BoundingBox to search.
+        :return: The ids of every shape whose bounds intersect with the provided bounds.
+        """
+        return self.broad_phase.query(bounds)
 
-    @staticmethod
-    def generate_bounds_from(pol1):
+    def candidate_pairs(self):
         """
-        Creates a bounding box from the inputted polygon.
-        :param pol1: The polygon represented by list of vertices.
-        :return: An axis-aligned bounding box from the provided shape.
+        :return: An iterable of the id pairs whose bounding boxes intersect.
         """
-        min_vec = Vector2(9999999, 99999999)
-        max_vec = Vector2(-9999999, -99999999)
-        for vertex in pol1:
-            vector_vertex = Vector2.from_type(vertex)
-            if max_vec.x < vector_vertex.x:
-                max_vec.x = vector_vertex.x
+        return self.broad_phase.pairs()
 
-            if min_vec.x >= vector_vertex.x:
-                min_vec.x = vector_vertex.x
+    def colliding_pairs(self, contacts=False):
+        """
+        Yields a (shape_id1, shape_id2, IntersectResult) tuple for every pair of shapes
+        that are intersecting. The first id is always the lower one, and the MTV moves
+        the second shape out of the first.
+        :param contacts: If true, the contact points of every pair are stored in its IntersectResult.
+        """
+        shapes = self._shapes
+        axis_cache = self.axis_cache
+        for id1, id2 in self.broad_phase.pairs():
+            # Keeping the order of each pair stable between frames so the cached axes can be reused.
+            if id2 < id1:
+                id1, id2 = id2, id1
+            result = IntersectTester(shapes[id1], shapes[id2], axis_cache, self.engine).test_narrow(contacts)
+            if result.intersecting:
+                yield id1, id2, result
 
-            if max_vec.y < vector_vertex.y:
-                max_vec.y = vector_vertex.y
+    def raycast(self, origin, direction, max_distance=None):
+        """
+        Casts a ray through the world and finds the closest shape it hits. The broad phase only passes
+        on the shapes whose bounds the ray crosses, roughly from the nearest to the furthest, and stops
+        once no closer hit is possible.
+        :param origin: The start of the ray.
+        :param direction: The direction of the ray. Does not have to be a unit vector.
+        :param max_distance: Optional. How far the ray reaches. Defaults to no limit.
+        :return: A RaycastResult with the id of the shape that was hit, or None when the ray hits nothing.
+        """
+        ox, oy, dx, dy, max_distance = _ray_arguments(origin, direction, max_distance)
+        shapes = self._shapes
+        origin = Vector2(ox, oy)
+        direction = Vector2(dx, dy)
+        closest = [None]
 
-            if min_vec.y > vector_vertex.y:
-                min_vec.y = vector_vertex.y
+        def callback(shape_id):
+            limit = max_distance if closest[0] is None else closest[0].distance
+            result = shapes[shape_id].raycast(origin, direction, limit)
+            if result is None:
+                return None
+            if closest[0] is None or result.distance < closest[0].distance:
+                result.shape_id = shape_id
+                closest[0] = result
+            return result.distance
 
-        return BoundingBox(min_vec.x, min_vec.y, max_vec.x - min_vec.x, max_vec.y - min_vec.y)
+        self.broad_phase.raycast(ox, oy, dx, dy, max_distance, callback)
+        return closest[0]
 
 
 class Vector2:
+    """
+    A 2D vector. Uses __slots__ to keep instances small and quick to create. The in-place
+    methods iadd, isub and scale_ change the vector itself so tight loops can reuse
+    scratch vectors instead of creating new ones.
+    """
+
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
         """
         Initializes a new Vector2
@@ -263,14 +4009,60 @@ class Vector2:
     def __eq__(self, other):
         return self.x == other.x and self.y == other.y
 
+    # In-place operations...
+
+    def iadd(self, other):
+        """
+        Adds the other vector to this one in place.
+        :return: Itself, so calls can be chained.
+        """
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def isub(self, other):
+        """
+        Subtracts the other vector from this one in place.
+        :return: Itself, so calls can be chained.
+        """
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def scale_(self, scalar):
+        """
+        Multiplies this vector by the scalar in place.
+        :return: Itself, so calls can be chained.
+        """
+        self.x *= scalar
+        self.y *= scalar
+        return self
+
+    def set(self, x, y):
+        """
+        Overwrites both coordinates in place.
+        :return: Itself, so calls can be chained.
+        """
+        self.x = x
+        self.y = y
+        return self
+
+    def copy(self):
+        return Vector2(self.x, self.y)
+
     def magnitude(self):
         """
         Returns the magnitude of the vector.
         :return:
         """
-        from math import sqrt
         return sqrt((self.x * self.x) + (self.y * self.y))
 
+    def length_squared(self):
+        """
+        :return: The squared magnitude of the vector. Cheaper than magnitude when only comparing lengths.
+        """
+        return (self.x * self.x) + (self.y * self.y)
+
     def normalized(self):
         """
         :return: Returns the unit vector of itself.
@@ -286,21 +4078,14 @@ class Vector2:
         Converts the inputted vertex from a tuple to a Vector2. If the inputted vertex
         is already a Vector2, the function will just return the inputted Vector2.
         If the inputted vertex is not a Vector2 or a tuple, the method will raise a TypeError.
+        Other types with a vertex adapter, see register_vertex_adapter, are converted as well.
         :param vertex: The tuple to be converted.
         :return: Returns a Vector2 representation of the tuple.
         """
-        import sys
-        if 'graphics' in sys.modules:
-            from graphics import Point
-            if isinstance(vertex, Point):
-                return cls(vertex.x, vertex.y)
         if isinstance(vertex, Vector2):
             return vertex
-        elif isinstance(vertex, tuple):
-            return cls(vertex[0], vertex[1])
-        else:
-            raise TypeError("Inputted vertex is not a tuple, Vector2 or Point! Expected: tuple || Vector2 || Point got: " +
-                            type(vertex).__name__)
+        x, y = _find_vertex_adapter(type(vertex))(vertex)
+        return cls(x, y)
 
     def dot(self, right):
         return self.x * right.x + self.y * right.y
@@ -315,6 +4100,13 @@ class Vector2:
         return self.x == 0 and self.y == 0
 
 
+register_vertex_adapter(tuple, _coordinates_of_sequence)
+register_vertex_adapter(list, _coordinates_of_sequence)
+register_vertex_adapter(Vector2, _coordinates_of_attributes)
+if np is not None:
+    register_vertex_adapter(np.ndarray, _coordinates_of_sequence)
+
+
 class ShapeProjection:
     """
     Projection of 2D polygon into 1D.
@@ -356,6 +4148,93 @@ class ShapeProjection:
         return other.minimum > self.minimum and other.maximum < self.maximum
 
 
+class DistanceResult:
+    """
+    Return type of IntersectTester.distance. Carries the distance between two shapes and
+    the closest point on each of them.
+    """
+
+    def __init__(self, distance, point1, point2):
+        """
+        :param distance: The distance between the shapes. 0 when they intersect.
+        :param point1: The point on the first shape closest to the second, as a Vector2. None when intersecting.
+        :param point2: The point on the second shape closest to the first, as a Vector2. None when intersecting.
+        """
+        self.distance = distance
+        self.point1 = point1
+        self.point2 = point2
+
+    def __repr__(self):
+        return "DistanceResult(Distance: " + str(self.distance) + " Point1: " + str(self.point1) + \
+               " Point2: " + str(self.point2) + ")"
+
+
+class SweepResult:
+    """
+    Return type of IntersectTester.sweep. Carries whether two moving shapes hit each other during the step,
+    the time of impact, the contact normal and the axis the shapes touched on last.
+    """
+
+    def __init__(self, hit, toi, normal, axis):
+        """
+        :param hit: A boolean representing whether the shapes touch during the step.
+        :param toi: The fraction of the step, between 0 and 1, at which the shapes first touch. None without a hit.
+        :param normal: The unit contact normal pointing from the first shape towards the second. None without a hit.
+        :param axis: On a hit, the axis the shapes touched on last. Otherwise the axis that separated them,
+        or None when no axis was tested.
+        """
+        self.hit = hit
+        self.toi = toi
+        self.normal = normal
+        self.axis = axis
+
+    def __repr__(self):
+        return "SweepResult(Hit: " + str(self.hit) + " TOI: " + str(self.toi) + " Normal: " + \
+               str(self.normal) + " Axis: " + str(self.axis) + ")"
+
+
+class RaycastResult:
+    """
+    Return type of the raycast methods. Carries where a ray hit a shape, the normal of the surface it hit,
+    how far along the ray the hit is and, for CollisionWorld.raycast, the id of the shape that was hit.
+    """
+
+    def __init__(self, point, normal, distance, shape_id=None):
+        """
+        :param point: The point where the ray hit the shape, as a Vector2.
+        :param normal: The unit normal of the surface at the hit, as a Vector2. Faces the ray when the ray
+        started inside of the shape.
+        :param distance: The distance from the origin of the ray to the hit.
+        :param shape_id: The id of the shape within a CollisionWorld, or None for a single shape.
+        """
+        self.point = point
+        self.normal = normal
+        self.distance = distance
+        self.shape_id = shape_id
+
+    def __repr__(self):
+        return "RaycastResult(Point: " + str(self.point) + " Normal: " + str(self.normal) + \
+               " Distance: " + str(self.distance) + " Shape: " + str(self.shape_id) + ")"
+
+
+class ContactPoint:
+    """
+    A point where two intersecting shapes touch, with how deep it is inside of the other shape.
+    """
+
+    def __init__(self, point, depth):
+        """
+        :param point: The contact point as a Vector2. Lies on the surface of the shape that was clipped against
+        the reference edge of the other shape.
+        :param depth: How far the point is inside of the other shape along the contact normal.
+        """
+        self.point = point
+        self.depth = depth
+
+    def __repr__(self):
+        return "ContactPoint(Point: " + str(self.point) + " Depth: " + str(self.depth) + ")"
+
+
 class IntersectResult:
     """
     Return type used for resolving shape intersections.
@@ -363,18 +4242,21 @@ class IntersectResult:
     and the MTV - Minimum Translation Vector - for moving the shapes out of each other.
     """
 
-    def __init__(self, intersection: bool, mtv: Vector2):
+    def __init__(self, intersection: bool, mtv: Vector2, contacts=None):
         """
         Spawns a IntersectResult instance using the provided intersection boolean
         and mtv vector.
         :param intersection:
         :param mtv:
+        :param contacts: Optional. A list of up to two ContactPoint's where the shapes touch. Only filled in
+        when the test was asked for contacts, and None otherwise.
         """
         self.intersecting = intersection
         self.mtv = mtv
+        self.contacts = contacts
 
     def __repr__(self):
         return "IntersectResult(Intersection: " + str(self.intersecting) + " MTV: " + str(self.mtv) + ")"
 
     def __eq__(self, other):
-        return self.intersecting == other.intersection and self.mtv == other.mtv
+        return self.intersecting == other.intersecting and self.mtv == other.mtv
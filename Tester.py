@@ -1,5 +1,14 @@
+import random
 import unittest
+from math import cos, pi, sin, sqrt
+from array import array
 from SATCollision import *
+from SATCollision import _merge_axes
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class MyTestCase(unittest.TestCase):
@@ -64,6 +73,699 @@ class MyTestCase(unittest.TestCase):
         control_point = Vector2(50, 20)
         self.assertEqual(Vector2.from_type(sample_point), control_point)
 
+    def test_convex_shape_caching(self):
+        shape = ConvexShape([(0, 0), (0, 10), (10, 10), (10, 0), (0, 0)])
+        self.assertEqual(len(shape), 4)
+        self.assertIs(shape.get_normals(), shape.get_normals())
+        self.assertEqual(len(shape.get_normals()), 4)
+        self.assertEqual(shape.get_bounds(), BoundingBox(0, 0, 10, 10))
+
+        normals = shape.get_normals()
+        version = shape.version
+        shape.translate(5, 5)
+        self.assertIs(shape.get_normals(), normals)
+        self.assertEqual(shape.get_bounds(), BoundingBox(5, 5, 10, 10))
+        self.assertEqual(shape.version, version + 1)
+
+        shape.set_vertices([(0, 0), (0, 20), (20, 0)])
+        self.assertEqual(shape.get_bounds(), BoundingBox(0, 0, 20, 20))
+        self.assertEqual(len(shape.get_normals()), 3)
+
+    def test_convex_shape_tester(self):
+        control_shape1 = [(0, 0), (0, 10), (10, 10), (10, 0), (0, 0)]
+        control_shape2 = [(x + 5, y + 2) for (x, y) in control_shape1]
+        list_result = IntersectTester(control_shape1, control_shape2).test()
+        shape_result = IntersectTester(ConvexShape(control_shape1), ConvexShape(control_shape2)).test()
+        self.assertEqual(shape_result.intersecting, True)
+        self.assertEqual(shape_result.mtv, list_result.mtv)
+        self.assertEqual(shape_result.mtv, Vector2(5, 0))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_sat_batch(self):
+        square = [(0, 0), (0, 10), (10, 10), (10, 0), (0, 0)]
+        triangle = [(0, 0), (6, 12), (12, 0)]
+        pairs = [(square, [(x + 5, y + 2) for (x, y) in square]),
+                 (square, [(x + 30, y) for (x, y) in triangle]),
+                 (triangle, [(x + 4, y + 4) for (x, y) in square]),
+                 (square, [(x + 2, y + 2) for (x, y) in [(0, 0), (0, 3), (3, 3), (3, 0)]])]
+
+        intersecting, mtvs = IntersectTester.test_many(pairs)
+        for i, (pol1, pol2) in enumerate(pairs):
+            expected = IntersectTester(pol1, pol2).test_major()
+            self.assertEqual(bool(intersecting[i]), expected.intersecting)
+            self.assertAlmostEqual(mtvs[i][0], expected.mtv.x)
+            self.assertAlmostEqual(mtvs[i][1], expected.mtv.y)
+
+        # Pairs split over several chunks give the same results as a single chunk.
+        import SATCollision
+        store = PolygonStore()
+        for pol1, pol2 in pairs:
+            store.add(pol1)
+            store.add(pol2)
+        indices_a = list(range(0, 8, 2)) * 3
+        indices_b = list(range(1, 8, 2)) * 3
+        budget = SATCollision.SAT_BATCH_BUDGET
+        SATCollision.SAT_BATCH_BUDGET = 5 * 8 * 8
+        try:
+            self.assertEqual(SATCollision._batch_chunk_size(4, 4), 5)
+            chunked = sat_batch([pol1 for pol1, _ in pairs] * 3, [pol2 for _, pol2 in pairs] * 3)
+            chunked_indexed = sat_batch_indexed(store, indices_a, indices_b)
+        finally:
+            SATCollision.SAT_BATCH_BUDGET = budget
+        for result in (chunked, chunked_indexed):
+            self.assertEqual(list(result[0]), list(intersecting) * 3)
+            self.assertTrue(numpy.allclose(result[1], numpy.concatenate((mtvs, mtvs, mtvs))))
+
+        # Chunks of polygons with many vertices hold fewer pairs, so they stay within the budget.
+        for width in (4, 64, 128, 256, 4096):
+            size = SATCollision._batch_chunk_size(width, width)
+            self.assertGreaterEqual(size, 1)
+            if size > 1:
+                self.assertLessEqual(size * (2 * width) ** 2, SATCollision.SAT_BATCH_BUDGET)
+        self.assertLess(SATCollision._batch_chunk_size(256, 256), SATCollision._batch_chunk_size(64, 64))
+        self.assertEqual(SATCollision._batch_chunk_size(4096, 4096), 1)
+
+    def test_spatial_hash_grid(self):
+        grid = SpatialHashGrid(10)
+        boxes = {0: BoundingBox(0, 0, 5, 5), 1: BoundingBox(3, 3, 20, 20), 2: BoundingBox(21, 21, 5, 5),
+                 3: BoundingBox(50, 50, 5, 5), 4: BoundingBox(-8, -8, 9, 9)}
+        for key, bounds in boxes.items():
+            grid.insert(key, bounds)
+
+        expected = {(a, b) for a in boxes for b in boxes if a < b and boxes[a].intersects_with(boxes[b])}
+        self.assertEqual({tuple(sorted(pair)) for pair in grid.pairs()}, expected)
+        self.assertEqual(grid.query(BoundingBox(48, 48, 4, 4)), {3})
+
+        grid.update(3, BoundingBox(2, 2, 5, 5))
+        self.assertEqual(grid.query(BoundingBox(48, 48, 4, 4)), set())
+        self.assertIn((0, 3), {tuple(sorted(pair)) for pair in grid.pairs()})
+
+        grid.remove(1)
+        self.assertNotIn(1, grid)
+        self.assertEqual(grid.query(BoundingBox(10, 10, 5, 5)), set())
+
+    def test_collision_world(self):
+        world = CollisionWorld(SpatialHashGrid(16))
+        square = [(0, 0), (0, 10), (10, 10), (10, 0)]
+        first = world.add(square)
+        second = world.add([(x + 5, y + 2) for (x, y) in square])
+        third = world.add([(x + 40, y) for (x, y) in square])
+
+        results = list(world.colliding_pairs())
+        self.assertEqual(len(results), 1)
+        self.assertEqual({results[0][0], results[0][1]}, {first, second})
+
+        world.move(third, -26, 0)
+        self.assertEqual(len(list(world.colliding_pairs())), 2)
+
+    def test_sweep_and_prune(self):
+        sweep = SweepAndPrune('x')
+        boxes = {0: BoundingBox(0, 0, 5, 5), 1: BoundingBox(3, 3, 20, 20), 2: BoundingBox(21, 21, 5, 5),
+                 3: BoundingBox(50, 50, 5, 5), 4: BoundingBox(-8, -8, 9, 9), 5: BoundingBox(5, 0, 5, 5)}
+        for key, bounds in boxes.items():
+            sweep.insert(key, bounds)
+
+        def brute_force():
+            return {(a, b) for a in boxes for b in boxes if a < b and boxes[a].intersects_with(boxes[b])}
+
+        self.assertEqual({tuple(sorted(pair)) for pair in sweep.pairs()}, brute_force())
+
+        boxes[3] = BoundingBox(2, 2, 5, 5)
+        boxes[4] = BoundingBox(60, 60, 5, 5)
+        sweep.update(3, boxes[3])
+        sweep.update(4, boxes[4])
+        self.assertEqual({tuple(sorted(pair)) for pair in sweep.pairs()}, brute_force())
+        self.assertEqual(sweep.query(BoundingBox(58, 58, 4, 4)), {4})
+
+        sweep.remove(1)
+        del boxes[1]
+        self.assertEqual({tuple(sorted(pair)) for pair in sweep.pairs()}, brute_force())
+
+        world = CollisionWorld(SweepAndPrune())
+        square = [(0, 0), (0, 10), (10, 10), (10, 0)]
+        world.add(square)
+        world.add([(x + 5, y + 2) for (x, y) in square])
+        self.assertEqual(len(list(world.colliding_pairs())), 1)
+
+    def test_dynamic_aabb_tree(self):
+        tree = DynamicAABBTree(margin=1)
+        boxes = {}
+        for i in range(128):
+            boxes[i] = BoundingBox(i * 4, (i % 7) * 3, 5, 5)
+            tree.insert(i, boxes[i])
+
+        # Inserting boxes in order would give a linked list without rotations.
+        self.assertLessEqual(tree.get_height(), 16)
+
+        def brute_force():
+            return {(a, b) for a in boxes for b in boxes if a < b and boxes[a].intersects_with(boxes[b])}
+
+        self.assertEqual({tuple(sorted(pair)) for pair in tree.pairs()}, brute_force())
+        self.assertEqual(tree.query(BoundingBox(0, 0, 2, 2)), {0})
+        self.assertEqual(tree.query_point(9, 7), {1, 2})
+
+        boxes[5] = BoundingBox(20.5, 15, 5, 5)
+        self.assertEqual(tree.update(5, boxes[5]), False)
+        boxes[6] = BoundingBox(1000, 1000, 5, 5)
+        self.assertEqual(tree.update(6, boxes[6]), True)
+        self.assertEqual({tuple(sorted(pair)) for pair in tree.pairs()}, brute_force())
+        self.assertEqual(tree.query_point(1002, 1002), {6})
+
+        for i in range(0, 128, 2):
+            tree.remove(i)
+            del boxes[i]
+        self.assertEqual(len(tree), 64)
+        self.assertEqual({tuple(sorted(pair)) for pair in tree.pairs()}, brute_force())
+
+    def test_separating_axis_cache(self):
+        cache = SeparatingAxisCache()
+        square = ConvexShape([(0, 0), (0, 10), (10, 10), (10, 0)])
+        other = ConvexShape([(20, 0), (20, 10), (30, 10), (30, 0)])
+
+        self.assertEqual(IntersectTester(square, other, cache).test_major().intersecting, False)
+        index = cache.get(square, other)
+        self.assertEqual(square.get_axes()[index], Vector2(1, 0))
+
+        self.assertEqual(IntersectTester(square, other, cache).test_major().intersecting, False)
+        other.translate(-15, 2)
+        result = IntersectTester(square, other, cache).test_major()
+        self.assertEqual(result.intersecting, True)
+        self.assertEqual(result.mtv, IntersectTester(square, other).test_major().mtv)
+
+        # Lists are converted on every test so they are never cached.
+        IntersectTester([(0, 0), (0, 1), (1, 0)], other, cache).test_major()
+        self.assertEqual(len(cache), 1)
+        cache.discard(other)
+        self.assertEqual(len(cache), 0)
+
+        # The least recently used pair is evicted when the cache is full.
+        cache = SeparatingAxisCache(2)
+        shapes = [ConvexShape([(x, 0), (x, 10), (x + 10, 10), (x + 10, 0)]) for x in range(0, 80, 20)]
+        cache.store(shapes[0], shapes[1], 0)
+        cache.store(shapes[1], shapes[2], 1)
+        self.assertEqual(cache.get(shapes[0], shapes[1]), 0)
+        cache.store(shapes[2], shapes[3], 0)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get(shapes[1], shapes[2]), None)
+        self.assertEqual(cache.get(shapes[0], shapes[1]), 0)
+        cache.discard(shapes[1])
+        cache.discard(shapes[2])
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache._pairs_of, {})
+        with self.assertRaises(ValueError):
+            SeparatingAxisCache(0)
+
+    def test_axes_deduplication(self):
+        from math import cos, sin, pi
+        square = ConvexShape([(0, 0), (0, 10), (10, 10), (10, 0), (0, 0)])
+        self.assertEqual(len(square.get_normals()), 4)
+        self.assertEqual(len(square.get_axes()), 2)
+
+        hexagon = ConvexShape([(cos(i * pi / 3) * 10, sin(i * pi / 3) * 10) for i in range(6)])
+        self.assertEqual(len(hexagon.get_axes()), 3)
+        for axis in hexagon.get_axes():
+            self.assertTrue(axis.y > 0 or (axis.y == 0 and axis.x > 0))
+
+        other_square = ConvexShape([(5, 5), (5, 15), (15, 15), (15, 5)])
+        tester = IntersectTester(square, other_square)
+        self.assertEqual(len(_merge_axes(square, other_square)), 2)
+        self.assertEqual(len(_merge_axes(square, hexagon)), 4)
+        self.assertEqual(tester.test_major().mtv.magnitude(), 5)
+
+    def test_hill_climbing_projection(self):
+        from math import cos, sin, pi
+        import random
+        rng = random.Random(8)
+        circle = ConvexShape([(cos(i * pi / 100) * 50 + 3, sin(i * pi / 100) * 50 - 7) for i in range(200)])
+        # Many collinear vertices along every side.
+        square = ConvexShape([(0, y) for y in range(10)] + [(x, 10) for x in range(10)] +
+                             [(10, y) for y in range(10, 0, -1)] + [(x, 0) for x in range(10, 0, -1)])
+        for shape in (circle, square):
+            self.assertGreaterEqual(len(shape), HILL_CLIMB_THRESHOLD)
+            axes = [Vector2(1, 0), Vector2(0, 1), Vector2(-1, 0), Vector2(0, -1), Vector2(1, 0)]
+            for _ in range(100):
+                angle = rng.uniform(0, 2 * pi)
+                axes.append(Vector2(cos(angle), sin(angle)))
+            for axis in axes:
+                dots = [axis.dot(vertex) for vertex in shape]
+                self.assertEqual(shape.project(axis), ShapeProjection(min(dots), max(dots)))
+
+    def test_gjk(self):
+        from math import cos, sin, pi
+        control_shape1 = [(0, 0), (0, 10), (10, 10), (10, 0), (0, 0)]
+        control_shape2 = [(x + 5, y + 2) for (x, y) in control_shape1]
+        result = IntersectTester(control_shape1, control_shape2, engine='gjk').test()
+        self.assertEqual(result.intersecting, True)
+        self.assertAlmostEqual(result.mtv.x, 5)
+        self.assertAlmostEqual(result.mtv.y, 0)
+
+        control_shape3 = [(x + 12, y + 12) for (x, y) in control_shape1]
+        self.assertEqual(IntersectTester(control_shape1, control_shape3).test_gjk().intersecting, False)
+
+        # Shapes sharing a center, where the first search direction passes straight through the origin.
+        octagon = [(cos(i * pi / 4) * 10, sin(i * pi / 4) * 10) for i in range(8)]
+        small = [(x / 2, y / 2) for (x, y) in octagon]
+        result = IntersectTester(octagon, small, engine='gjk').test()
+        self.assertEqual(result.intersecting, True)
+        self.assertAlmostEqual(result.mtv.magnitude(), 15 * cos(pi / 8))
+
+        self.assertEqual(IntersectTester(octagon, small, engine='auto').test_narrow(), result)
+        with self.assertRaises(ValueError):
+            IntersectTester(octagon, small, engine='epa')
+
+    def test_distance(self):
+        square = [(0, 0), (0, 10), (10, 10), (10, 0)]
+        result = IntersectTester(square, [(x + 13, y + 5) for (x, y) in square]).distance()
+        self.assertAlmostEqual(result.distance, 3)
+        self.assertAlmostEqual(result.point1.x, 10)
+        self.assertAlmostEqual(result.point2.x, 13)
+        self.assertTrue(5 <= result.point1.y <= 10)
+        self.assertAlmostEqual(result.point1.y, result.point2.y)
+
+        result = IntersectTester(square, [(13, 14), (20, 13), (20, 20)]).distance()
+        self.assertAlmostEqual(result.distance, 5)
+        self.assertAlmostEqual(result.point1.distance_from(Vector2(10, 10)), 0)
+        self.assertAlmostEqual(result.point2.distance_from(Vector2(13, 14)), 0)
+
+        self.assertEqual(IntersectTester(square, [(x + 5, y) for (x, y) in square]).distance().distance, 0)
+        self.assertIsNone(IntersectTester(square, [(x + 100, y) for (x, y) in square]).distance(max_distance=50))
+        self.assertAlmostEqual(IntersectTester(square, [(x + 100, y) for (x, y) in square])
+                               .distance(max_distance=100).distance, 90)
+
+    def test_vector_in_place(self):
+        vector = Vector2(1, 2)
+        self.assertFalse(hasattr(vector, '__dict__'))
+        self.assertIs(vector.iadd(Vector2(2, 2)), vector)
+        self.assertEqual(vector, Vector2(3, 4))
+        self.assertEqual(vector.length_squared(), 25)
+        self.assertEqual(vector.magnitude(), 5)
+        vector.isub(Vector2(1, 1)).scale_(2)
+        self.assertEqual(vector, Vector2(4, 6))
+        copy = vector.copy()
+        vector.set(0, 0)
+        self.assertEqual(copy, Vector2(4, 6))
+        self.assertTrue(vector.isZero())
+
+    def test_polygon_store(self):
+        store = PolygonStore()
+        square = store.add([(0, 0), (0, 10), (10, 10), (10, 0), (0, 0)])
+        triangle = store.add([(5, 2), (8, 14), (14, 2)])
+        self.assertEqual(len(store), 2)
+        self.assertEqual(len(store.xs), 7)
+        self.assertEqual(list(triangle), [Vector2(5, 2), Vector2(8, 14), Vector2(14, 2)])
+        self.assertEqual(triangle.get_bounds(), BoundingBox(5, 2, 9, 12))
+        self.assertEqual(IntersectTester(square, triangle).test(),
+                         IntersectTester(list(square), list(triangle)).test())
+
+        square.translate(1, 0)
+        self.assertEqual(store.xs[0], 1)
+        square.set_vertices([(0, 0), (0, 4), (4, 4), (4, 0)])
+        self.assertEqual(len(store.xs), 7)
+        triangle.set_vertices([(0, 0), (4, 0), (4, 4), (0, 4), (-1, 2)])
+        self.assertEqual(len(store.xs), 12)
+        self.assertEqual(triangle[4], Vector2(-1, 2))
+        self.assertEqual(square[-1], Vector2(4, 0))
+
+        if numpy is not None:
+            intersecting, mtvs = sat_batch([square, square], [triangle, square])
+            self.assertEqual(list(intersecting), [True, True])
+            xs, ys, starts, counts = store.as_numpy()
+            self.assertEqual(list(counts), [4, 5])
+            self.assertEqual(xs[starts[1] + 4], -1)
+
+    def test_to_polygon(self):
+        class Node:
+            def __init__(self, position):
+                self.position = position
+
+        register_vertex_adapter(Node, lambda node: node.position)
+        shape = to_polygon([Node((0, 0)), (0, 10), [10, 10], Vector2(10, 0)])
+        self.assertIs(to_polygon(shape), shape)
+        self.assertEqual(list(shape), [Vector2(0, 0), Vector2(0, 10), Vector2(10, 10), Vector2(10, 0)])
+        self.assertEqual(Vector2.from_type(Node((3, 4))), Vector2(3, 4))
+        self.assertEqual(BoundingBox.generate_bounds_from([(1, 2), [5, 7]]), BoundingBox(1, 2, 4, 5))
+
+        with self.assertRaises(TypeError):
+            to_polygon([(0, 0), "10, 10", (10, 0)])
+
+        if numpy is not None:
+            array_shape = to_polygon(numpy.array([[0, 0], [0, 10], [10, 10], [10, 0], [0, 0]]))
+            self.assertEqual(list(array_shape), list(shape))
+            self.assertEqual(Vector2.from_type(numpy.array([1.5, 2.5])), Vector2(1.5, 2.5))
+
+    def test_round_shapes(self):
+        from math import pi
+        square = [(0, 0), (0, 10), (10, 10), (10, 0)]
+
+        result = IntersectTester(Circle((0, 0), 5), Circle((6, 8), 6)).test()
+        self.assertEqual(result.intersecting, True)
+        self.assertAlmostEqual(result.mtv.x, 0.6)
+        self.assertAlmostEqual(result.mtv.y, 0.8)
+        self.assertEqual(IntersectTester(Circle((0, 0), 5), Circle((6, 8), 4)).test().intersecting, False)
+
+        result = IntersectTester(square, Circle((13, 5), 5)).test()
+        self.assertAlmostEqual(result.mtv.x, 2)
+        self.assertAlmostEqual(result.mtv.y, 0)
+        result = IntersectTester(Circle((13, 5), 5), square).test()
+        self.assertAlmostEqual(result.mtv.x, -2)
+        # Apart along the axis from the closest corner only.
+        self.assertEqual(IntersectTester(square, Circle((14, 14), 5)).test().intersecting, False)
+        self.assertEqual(IntersectTester(square, Circle((13, 13), 5)).test().intersecting, True)
+
+        capsule = Capsule((-5, 12), (15, 12), 3)
+        result = IntersectTester(square, capsule).test()
+        self.assertEqual(result.intersecting, True)
+        self.assertAlmostEqual(result.mtv.x, 0)
+        self.assertAlmostEqual(result.mtv.y, 1)
+        result = IntersectTester(capsule, Capsule((5, 0), (5, 20), 1)).test()
+        self.assertAlmostEqual(result.mtv.magnitude(), 12)
+        self.assertEqual(IntersectTester(capsule, Circle((5, 20), 4)).test().intersecting, False)
+        self.assertAlmostEqual(IntersectTester(capsule, Circle((5, 20), 4)).distance().distance, 1)
+
+        box1 = OrientedBox((0, 0), 10, 2, pi / 4)
+        box2 = OrientedBox((6, 6), 2, 2)
+        self.assertEqual(len(_merge_axes(box1, box2)), 4)
+        result = IntersectTester(box1, box2).test()
+        polygon_result = IntersectTester(list(box1), list(box2)).test()
+        self.assertEqual(result.intersecting, polygon_result.intersecting)
+        self.assertAlmostEqual(result.mtv.x, polygon_result.mtv.x)
+        self.assertAlmostEqual(result.mtv.y, polygon_result.mtv.y)
+        box2.translate(10, 0)
+        self.assertEqual(IntersectTester(box1, box2).test().intersecting, False)
+
+        world = CollisionWorld()
+        world.add(Circle((0, 0), 5))
+        world.add(capsule)
+        world.add(square)
+        self.assertEqual(len(list(world.colliding_pairs())), 2)
+
+        # Every shape type has bounds, and gets back a copy of them.
+        circle = Circle((1, 2), 5)
+        for shape, expected in ((circle, BoundingBox(-4, -3, 10, 10)), (capsule, BoundingBox(-8, 9, 26, 6)),
+                                (box2, box2.get_bounds()), (CompoundShape(square), BoundingBox(0, 0, 10, 10))):
+            bounds = BoundingBox.generate_bounds_from(shape)
+            self.assertEqual(bounds, expected)
+            self.assertIsNot(bounds, shape.get_bounds())
+
+    def test_compound_shape(self):
+        l_shape = CompoundShape([(0, 0), (30, 0), (30, 10), (10, 10), (10, 30), (0, 30), (0, 0)])
+        self.assertEqual(len(l_shape), 6)
+        self.assertEqual(len(l_shape.get_pieces()), 2)
+        self.assertEqual(len(CompoundShape([(0, 0), (0, 10), (10, 10), (10, 0)]).get_pieces()), 1)
+
+        # Inside of the bounding box, but in the notch of the L.
+        in_notch = [(20, 20), (25, 20), (25, 25), (20, 25)]
+        self.assertEqual(IntersectTester(l_shape, in_notch).test_minor(), True)
+        self.assertEqual(IntersectTester(l_shape, in_notch).test().intersecting, False)
+        self.assertAlmostEqual(IntersectTester(l_shape, in_notch).distance().distance, 10)
+
+        result = IntersectTester(l_shape, [(20, 5), (25, 5), (25, 25), (20, 25)]).test()
+        self.assertEqual(result.intersecting, True)
+        self.assertEqual(result.mtv, Vector2(0, 5))
+        self.assertEqual(IntersectTester(l_shape, Circle((20, 20), 5), engine='gjk').test().intersecting, False)
+
+        l_shape.translate(20, 0)
+        self.assertEqual(IntersectTester(l_shape, in_notch).test().intersecting, True)
+        self.assertEqual(l_shape.get_bounds(), BoundingBox(20, 0, 30, 30))
+
+        # A concave star with enough vertices for a convex shape to hill climb.
+        star = [((10 if i % 2 else 4) * cos(i * pi / 20), (10 if i % 2 else 4) * sin(i * pi / 20)) for i in range(40)]
+        compound = CompoundShape(star)
+        for angle in range(0, 360, 7):
+            axis = Vector2(cos(angle * pi / 180), sin(angle * pi / 180))
+            values = [axis.x * x + axis.y * y for x, y in star]
+            projection = IntersectTester.projection_of_onto(compound, axis)
+            self.assertAlmostEqual(projection.minimum, min(values))
+            self.assertAlmostEqual(projection.maximum, max(values))
+
+    def test_sweep(self):
+        wall = [(100, 0), (102, 0), (102, 100), (100, 100)]
+        bullet = [(0, 40), (10, 40), (10, 50), (0, 50)]
+        tester = IntersectTester(bullet, wall)
+
+        # Passes through the wall within a single step.
+        self.assertEqual(tester.test().intersecting, False)
+        result = tester.sweep((500, 0))
+        self.assertEqual(result.hit, True)
+        self.assertAlmostEqual(result.toi, 0.18)
+        self.assertEqual(result.normal, Vector2(1, 0))
+        self.assertAlmostEqual(tester.sweep((0, 0), (-500, 0)).toi, 0.18)
+
+        self.assertEqual(tester.sweep((50, 0)).hit, False)
+        self.assertEqual(tester.sweep((500, 500)).hit, False)
+        self.assertEqual(IntersectTester([(99, 40), (110, 40), (110, 50), (99, 50)], wall).sweep((5, 0)).toi, 0)
+        with self.assertRaises(TypeError):
+            IntersectTester(Circle((0, 0), 5), wall).sweep((500, 0))
+
+    def test_raycast(self):
+        square = ConvexShape([(0, 0), (10, 0), (10, 10), (0, 10)])
+        result = square.raycast((-5, 5), (2, 0))
+        self.assertEqual(result.point, Vector2(0, 5))
+        self.assertEqual(result.normal, Vector2(-1, 0))
+        self.assertEqual(result.distance, 5)
+        self.assertEqual(square.raycast((-5, 5), (1, 0), 4), None)
+        self.assertEqual(square.raycast((-5, 5), (-1, 0)), None)
+        self.assertEqual(square.raycast((5, 5), (1, 0)).distance, 0)
+        self.assertEqual(Circle((0, 0), 5).raycast((-10, 0), (1, 0)).point, Vector2(-5, 0))
+        self.assertEqual(Capsule((0, 0), (10, 0), 2).raycast((5, -10), (0, 1)).distance, 8)
+        with self.assertRaises(ValueError):
+            square.raycast((0, 0), (0, 0))
+
+        for broad_phase in (SpatialHashGrid(16), SweepAndPrune(), DynamicAABBTree()):
+            world = CollisionWorld(broad_phase)
+            world.add([(30, 0), (32, 0), (32, 100), (30, 100)])
+            near = world.add([(10, 40), (20, 40), (20, 60), (10, 60)])
+            world.add(Circle((-20, 50), 5))
+            result = world.raycast((0, 50), (1, 0))
+            self.assertEqual(result.shape_id, near)
+            self.assertEqual(result.point, Vector2(10, 50))
+            self.assertEqual(world.raycast((0, 50), (1, 0), 5), None)
+            self.assertEqual(world.raycast((0, 50), (0, 1)), None)
+            # Long rays that miss stop walking once they leave the shapes behind.
+            self.assertEqual(world.raycast((0, 50), (0, 1), 1e9), None)
+            self.assertEqual(world.raycast((25, -5), (0, 1), 1e9), None)
+            self.assertEqual(world.raycast((0, 50), (1, 0), 1e9).shape_id, near)
+            world.remove(near)
+            self.assertEqual(world.raycast((0, 50), (1, 0)).distance, 30)
+
+    def test_contacts(self):
+        square = [(0, 0), (10, 0), (10, 10), (0, 10)]
+        resting = [(2, 8), (8, 8), (8, 14), (2, 14)]
+        self.assertEqual(IntersectTester(square, resting).test().contacts, None)
+        for engine in ENGINES:
+            contacts = IntersectTester(square, resting, engine=engine).test(contacts=True).contacts
+            self.assertEqual(sorted((c.point.x, c.point.y) for c in contacts), [(2, 8), (8, 8)])
+            self.assertEqual([c.depth for c in contacts], [2, 2])
+
+        # Only the tip of the diamond is inside of the square.
+        contacts = IntersectTester(square, [(5, 9), (9, 13), (5, 17), (1, 13)]).test(contacts=True).contacts
+        self.assertEqual(len(contacts), 1)
+        self.assertEqual(contacts[0].point, Vector2(5, 9))
+        self.assertEqual(contacts[0].depth, 1)
+
+        # The wide box is clipped to the sides of the square.
+        contacts = IntersectTester(square, [(-5, 9), (15, 9), (15, 17), (-5, 17)]).test(contacts=True).contacts
+        self.assertEqual(sorted((c.point.x, c.point.y) for c in contacts), [(0, 9), (10, 9)])
+
+        # Deep inside each other, there is always a contact and none is deeper than the MTV.
+        import Benchmark
+        rng = random.Random(1)
+        for _ in range(300):
+            shape1 = Benchmark.random_convex_polygon(rng, rng.randint(3, 8), 10, 0, 0)
+            shape2 = Benchmark.random_convex_polygon(rng, rng.randint(3, 8), rng.uniform(1, 10),
+                                                     rng.uniform(-8, 8), rng.uniform(-8, 8))
+            for engine in ('sat', 'gjk'):
+                result = IntersectTester(shape1, shape2, engine=engine).test(contacts=True)
+                if result.intersecting:
+                    self.assertGreater(len(result.contacts), 0)
+                    for contact in result.contacts:
+                        self.assertLessEqual(contact.depth, result.mtv.magnitude() + 1e-9)
+
+        contacts = IntersectTester(Circle((5, 12), 3), square).test(contacts=True).contacts
+        self.assertEqual(contacts[0].point, Vector2(5, 9))
+        self.assertEqual(contacts[0].depth, 1)
+
+        world = CollisionWorld()
+        world.add(square)
+        world.add(resting)
+        self.assertEqual(len(list(world.colliding_pairs(contacts=True))[0][2].contacts), 2)
+
+    def test_parallel_collision_runner(self):
+        polygons = [[(0, 0), (10, 0), (10, 10), (0, 10)], [(5, 5), (15, 5), (15, 15), (5, 15)],
+                    [(50, 50), (60, 50), (60, 60)]]
+        pairs = [(0, 1), (0, 2), (1, 2), (1, 0)]
+        store = PolygonStore()
+        for polygon in polygons:
+            store.add(polygon)
+        for runner, shapes in ((ParallelCollisionRunner(1), polygons), (ParallelCollisionRunner(2, 1), store)):
+            hits, mtv_x, mtv_y = runner.run(shapes, pairs)
+            self.assertEqual(list(hits), [1, 0, 0, 1])
+            for i, (index1, index2) in enumerate(pairs):
+                result = IntersectTester(polygons[index1], polygons[index2]).test()
+                self.assertEqual(Vector2(mtv_x[i], mtv_y[i]), result.mtv)
+
+        self.assertEqual(ParallelCollisionRunner(1).run(polygons, []), (array('b'), array('d'), array('d')))
+        with self.assertRaises(IndexError):
+            ParallelCollisionRunner(1).run(polygons, [(0, 3)])
+        with self.assertRaises(TypeError):
+            ParallelCollisionRunner(1).run([Circle((0, 0), 5)], [(0, 0)])
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_threaded_batch_runner(self):
+        square = [(0, 0), (10, 0), (10, 10), (0, 10)]
+        store = PolygonStore()
+        store.add(square)
+        store.add([(x + 5, y + 2) for (x, y) in square])
+        store.add([(x + 500, y) for (x, y) in square])
+        intersecting, mtvs = sat_batch_indexed(store, [0, 0, 1], [1, 2, 0])
+        self.assertEqual(list(intersecting), [True, False, True])
+        self.assertEqual([tuple(mtv) for mtv in mtvs], [(5, 0), (0, 0), (-5, 0)])
+
+        pairs = [(store[0], store[1]), (store[2], store[0]), (store[2], store[1])]
+        with ThreadedBatchRunner(2) as runner:
+            shards = runner.shard_by_region(pairs, 100)
+            self.assertEqual(sorted(len(shard) for shard in shards.values()), [1, 2])
+            results = runner.run(shards)
+            self.assertEqual(list(results[(0, 0)][0]), [True])
+            self.assertEqual(list(results[(5, 0)][0]), [False, False])
+            intersecting = runner.submit_indexed(store, [0, 1], [1, 2]).result()[0]
+            self.assertEqual(list(intersecting), [True, False])
+
+    def test_benchmark_compare(self):
+        import Benchmark
+        baseline = {'test': 1.0, 'test_major': 2.0, 'removed': 1.0}
+        results = {'test': 1.05, 'test_major': 3.0, 'added': 5.0}
+        self.assertEqual(Benchmark.compare(results, baseline, 0.1), [('test_major', 2.0, 3.0, 1.5)])
+        self.assertEqual(Benchmark.compare(results, baseline, 0.6), [])
+
+        polygon = Benchmark.random_convex_polygon(random.Random(1), 8, 10, 0, 0)
+        self.assertEqual(polygon, Benchmark.random_convex_polygon(random.Random(1), 8, 10, 0, 0))
+        self.assertEqual(len(ConvexShape(polygon).get_axes()), 8)
+
+        # Every timing runs for at least the minimum time, however fast the function is.
+        calls = []
+        self.assertGreater(Benchmark.time_call(lambda: calls.append(None), 3, 0.3), 0)
+        self.assertGreater(len(calls), 1000)
+
+    def test_collision_stats(self):
+        square = ConvexShape([(0, 0), (10, 0), (10, 10), (0, 10)])
+        corner = ConvexShape([(9, 12), (12, 9), (20, 20)])
+        stats = CollisionStats()
+        IntersectTester(square, [(5, 5), (15, 5), (15, 15), (5, 15)], stats=stats).test()
+        IntersectTester(square, [(50, 5), (55, 5), (55, 15)], stats=stats).test()
+        self.assertEqual(IntersectTester(square, corner, stats=stats).test().intersecting, False)
+        snapshot = stats.snapshot(reset=True)
+        self.assertEqual(snapshot['tests'], 3)
+        self.assertEqual(snapshot['bounds_rejects'], 1)
+        self.assertEqual(snapshot['narrow_tests'], 2)
+        self.assertEqual(snapshot['intersections'], 1)
+        self.assertEqual(snapshot['sat_tests'], 2)
+        self.assertEqual(snapshot['sat_early_exits'], 1)
+        self.assertGreater(snapshot['narrow_ns'], 0)
+        self.assertEqual(stats.tests, 0)
+
+        # The cached separating axis is tested first, so the second test only projects onto one axis.
+        cache = SeparatingAxisCache()
+        IntersectTester(square, corner, cache).test_major()
+        IntersectTester.stats = stats
+        try:
+            IntersectTester(square, corner, cache).test_major()
+        finally:
+            IntersectTester.stats = None
+        self.assertEqual(stats.axes_tested, 1)
+        self.assertEqual(stats.vertices_projected_estimate, 7)
+        IntersectTester(square, corner).test()
+        self.assertEqual(stats.sat_tests, 1)
+
+    def test_boolean_only(self):
+        square = ConvexShape([(0, 0), (10, 0), (10, 10), (0, 10)])
+        slanted = ConvexShape([(8, 8), (20, 11), (17, 23)])
+        self.assertEqual(slanted.get_raw_axes()[0], Vector2(12, 3))
+        self.assertEqual(len(slanted.get_raw_axes()), len(slanted.get_axes()))
+
+        result = IntersectTester(square, slanted).test(want_mtv=False)
+        self.assertEqual(result.intersecting, True)
+        self.assertEqual(result.mtv, None)
+        self.assertEqual(IntersectTester(square, [(9, 12), (12, 9), (20, 20)]).test(want_mtv=False).intersecting,
+                         False)
+        self.assertEqual(IntersectTester(square, [(50, 0), (60, 0), (55, 5)]).test(want_mtv=False).mtv, None)
+        self.assertEqual(IntersectTester(square, OrientedBox((14, 5), 5, 1, 0.5)).test_overlap(), True)
+        self.assertEqual(IntersectTester(square, slanted, engine='gjk').test_overlap(), True)
+        self.assertEqual(IntersectTester(square, Circle((14, 14), 5)).test(want_mtv=False).intersecting, False)
+
+    def test_transformed_shape(self):
+        shape = TransformedShape([(-5, -5), (5, -5), (5, 5), (-5, 5)], (20, 0), 0.0, 2.0)
+        self.assertEqual(shape.get_bounds(), BoundingBox(10, -10, 20, 20))
+        self.assertEqual(shape[0], Vector2(10, -10))
+        bar = [(0, -1), (14, -1), (14, 1), (0, 1)]
+        self.assertEqual(IntersectTester(shape, bar).test().mtv, Vector2(-4, 0))
+
+        # Moving does not revisit the vertices.
+        normals = shape.get_normals()
+        shape.translate(-5, 0)
+        self.assertEqual(shape._world_valid, False)
+        self.assertEqual(shape.get_bounds(), BoundingBox(5, -10, 20, 20))
+        self.assertIs(shape.get_normals(), normals)
+        self.assertEqual(IntersectTester(shape, bar).test().mtv, Vector2(-9, 0))
+
+        shape.set_transform((20, 0), pi / 4)
+        self.assertIsNot(shape.get_normals(), normals)
+        self.assertAlmostEqual(shape.get_bounds().x, 20 - sqrt(2) * 5)
+        plain = ConvexShape(list(shape))
+        self.assertEqual(IntersectTester(shape, bar).test().mtv, IntersectTester(plain, bar).test().mtv)
+        self.assertAlmostEqual(shape.raycast((0, 0), (1, 0)).distance, 20 - sqrt(2) * 5)
+
+        world = CollisionWorld()
+        shape_id = world.add(shape)
+        world.add(bar)
+        world.move(shape_id, 100, 0)
+        self.assertEqual(list(world.colliding_pairs()), [])
+        with self.assertRaises(ValueError):
+            shape.set_scale(0)
+
+    def test_pair_result_cache(self):
+        cache = PairResultCache(max_size=2)
+        square = ConvexShape([(0, 0), (10, 0), (10, 10), (0, 10)])
+        other = ConvexShape([(5, 5), (15, 5), (15, 15), (5, 15)])
+        circle = Circle((30, 30), 2)
+        first = IntersectTester(square, other, result_cache=cache).test()
+        self.assertIs(IntersectTester(square, other, result_cache=cache).test(), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Moving a shape bumps its version, which invalidates its pairs.
+        other.translate(10, 10)
+        self.assertEqual(IntersectTester(square, other, result_cache=cache).test().intersecting, False)
+        self.assertEqual(cache.invalidations, 1)
+
+        # The options are part of the key, and the least recently used pair is evicted.
+        self.assertEqual(IntersectTester(square, other, result_cache=cache).test(want_mtv=False).mtv, None)
+        IntersectTester(square, circle, result_cache=cache).test()
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.get(square, other, ('sat', False, True)), None)
+
+        # Shapes converted from lists only live as long as their tester, so they are never cached.
+        IntersectTester([(0, 0), (1, 0), (0, 1)], square, result_cache=cache).test()
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 5, 2))
+        cache.discard(circle)
+        self.assertEqual(len(cache), 1)
+
+    def test_hill_climbing_repeated_vertices(self):
+        polygon = [(10 * cos(i * pi / 20), 10 * sin(i * pi / 20)) for i in range(40)]
+        polygon.insert(5, polygon[5])
+        polygon.append(polygon[0])
+        polygon.append(polygon[0])
+        shape = ConvexShape(polygon)
+        self.assertEqual(len(shape), 40)
+        shape._max_index = 5
+        self.assertAlmostEqual(shape.project(Vector2(1, 0)).maximum, 10)
+        for angle in range(0, 360, 7):
+            axis = Vector2(cos(angle * pi / 180), sin(angle * pi / 180))
+            values = [axis.x * x + axis.y * y for x, y in polygon]
+            self.assertAlmostEqual(shape.project(axis).maximum, max(values))
+            self.assertAlmostEqual(shape.project(axis).minimum, min(values))
+
 # Could maybe handle a shape as a wrapper, could chain methods like shape.test_major(otherShape)
 
 